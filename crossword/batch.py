@@ -0,0 +1,116 @@
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+from crossword import Crossword
+from generate import CrosswordCreator, WordIndex
+
+# State shared by every task in a batch worker process
+_worker = dict()
+
+
+def _init_worker(words, index):
+    """Stores the word set and its index once per batch worker process."""
+    _worker["words"] = words
+    _worker["index"] = index
+
+
+def is_structure(path):
+    """
+    Returns True if the file `path` looks like a structure file: a grid of
+    only "_" (open) and "#" (blocked) cells. Word lists are not.
+    """
+    with open(path) as f:
+        contents = f.read()
+    return bool(contents.strip()) and set(contents) <= set("_#\n")
+
+
+def fill(structure, fills, distinct, seed):
+    """
+    Generates up to `fills` solutions for the structure file `structure`,
+    using the worker's dictionary. Returns (structure, solutions, seconds),
+    where each solution is rendered as a string.
+    """
+    start = time.perf_counter()
+    crossword = Crossword(structure, words=_worker["words"])
+    creator = CrosswordCreator(crossword, seed=seed, index=_worker["index"])
+    solutions = [
+        creator.render(assignment)
+        for assignment in creator.solutions(limit=fills, distinct=distinct)
+    ]
+    return structure, solutions, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate crosswords for every structure file in a "
+                    "directory, preprocessing the dictionary only once."
+    )
+    parser.add_argument("structures", help="directory of structure files")
+    parser.add_argument("words")
+    parser.add_argument("--fills", type=int, default=1,
+                        help="number of solutions to generate per structure")
+    parser.add_argument("--distinct", action="store_true",
+                        help="use no word in more than one fill of a "
+                             "structure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--output", help="directory to write fills to")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.structures):
+        sys.exit(f"{args.structures} is not a directory.")
+    structures = sorted(
+        os.path.join(args.structures, name)
+        for name in os.listdir(args.structures)
+        if name.endswith(".txt")
+    )
+    structures = [path for path in structures if is_structure(path)]
+    if not structures:
+        sys.exit("No structure files found.")
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    with open(args.words) as f:
+        words = set(f.read().upper().splitlines())
+    index = WordIndex(words)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.processes,
+        initializer=_init_worker,
+        initargs=(words, index)
+    ) as executor:
+        futures = [
+            executor.submit(fill, structure, args.fills, args.distinct,
+                            args.seed)
+            for structure in structures
+        ]
+
+        # Report a structure that fails and carry on with the rest
+        failed = 0
+        for structure, future in zip(structures, futures):
+            name = os.path.splitext(os.path.basename(structure))[0]
+            try:
+                _, solutions, seconds = future.result()
+            except Exception as e:
+                print(f"{name}: failed: {e!r}", file=sys.stderr)
+                failed += 1
+                continue
+            print(f"{name}: {len(solutions)} fills in {seconds:.2f}s")
+            for k, solution in enumerate(solutions):
+                if args.output:
+                    path = os.path.join(args.output, f"{name}-{k}.txt")
+                    with open(path, "w") as f:
+                        f.write(solution + "\n")
+                else:
+                    print(solution)
+                    print()
+
+    if failed:
+        sys.exit(f"{failed} of {len(structures)} structures failed.")
+
+
+if __name__ == "__main__":
+    main()
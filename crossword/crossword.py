@@ -35,9 +35,24 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class Overlaps(dict):
+    """
+    Overlaps between pairs of variables, storing only the pairs that
+    intersect. Looking up any other pair gives None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file=None, words=None):
+        """
+        Read the structure from `structure_file` and the vocabulary from
+        `words_file`, or use `words`, a set of uppercase words, instead of
+        reading a file.
+        """
 
         # Determine structure of crossword
         with open(structure_file) as f:
@@ -58,8 +73,10 @@ class Crossword():
                 self.structure.append(row)
 
         # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        if words is None:
+            with open(words_file) as f:
+                words = set(f.read().upper().splitlines())
+        self.words = words
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +125,24 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored; other pairs look up as None.
+        occupants = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                occupants.setdefault(cell, []).append((var, k))
+        self.overlaps = Overlaps()
+        self.adjacent = {var: set() for var in self.variables}
+        for cell in occupants:
+            for v1, i in occupants[cell]:
+                for v2, j in occupants[cell]:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        self.adjacent[v1].add(v2)
+        self.adjacent = {
+            var: frozenset(neighbors)
+            for var, neighbors in self.adjacent.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacent[var]
@@ -1,19 +1,280 @@
-import sys
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import random
 
 from crossword import *
 
+# Default maximum number of nogoods remembered during a search
+NOGOOD_LIMIT = 10000
+
+# Number of failures allowed before the first restart; later runs are
+# allowed this many times the next term of the Luby sequence
+RESTART_FAILURES = 100
+
+
+# Workers poll for cancellation once every this many nodes
+CANCEL_CHECK_NODES = 64
+
+# Solver configurations run by the parallel portfolio; job k runs
+# configuration k modulo their number, with its own seed
+PORTFOLIO = [
+    dict(ordering="domwdeg", propagation="mac", restarts=True),
+    dict(ordering="mrv", propagation="mac", restarts=True),
+    dict(ordering="domwdeg", propagation="forward", restarts=True),
+    dict(ordering="domwdeg", propagation="mac", restarts=False),
+]
+
+# State shared by every task in a portfolio worker process
+_worker = dict()
+
+
+class Restart(Exception):
+    """Raised to abandon a search run that has used up its failures."""
+
+
+class Cancelled(Exception):
+    """Raised inside a portfolio worker once another has finished."""
+
+
+def luby(i):
+    """
+    Return the `i`th term, counting from 1, of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def word_ids(mask):
+    """
+    Yield the IDs of the words in bitset `mask`, in increasing order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class NogoodStore():
+    """
+    Bounded store of nogoods: sets of (variable, word) pairs that cannot
+    all be part of a solution. Once the store is full, adding a nogood
+    forgets the oldest one. A `limit` of None means no limit.
+    """
+
+    def __init__(self, limit=NOGOOD_LIMIT):
+        self.limit = limit
+        self.nogoods = collections.deque()
+
+        # Nogoods containing each (variable, word) pair
+        self.watch = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def add(self, nogood):
+        """
+        Add `nogood`, an iterable of (variable, word) pairs.
+        """
+        nogood = frozenset(nogood)
+        if not nogood or self.limit == 0:
+            return
+        if nogood in self.watch[next(iter(nogood))]:
+            return
+        self.nogoods.append(nogood)
+        for pair in nogood:
+            self.watch[pair].add(nogood)
+        if self.limit is not None and len(self.nogoods) > self.limit:
+            oldest = self.nogoods.popleft()
+            for pair in oldest:
+                self.watch[pair].discard(oldest)
+                if not self.watch[pair]:
+                    del self.watch[pair]
+
+    def violated(self, var, word, assignment):
+        """
+        If assigning `word` to `var` would complete a nogood given
+        `assignment`, return the set of the nogood's other variables;
+        otherwise return None.
+        """
+        for nogood in self.watch.get((var, word), ()):
+            if all(assignment.get(v) == w for v, w in nogood if v != var):
+                return {v for v, _ in nogood if v != var}
+        return None
+
+
+class WordIndex():
+    """
+    Dictionary preprocessed for search. Words get integer IDs, and sets of
+    words are bitsets of IDs. An index is never modified once built, so one
+    index can be shared by many creators.
+    """
+
+    def __init__(self, words):
+
+        # Every word has an integer ID, its index in `self.words`
+        self.words = sorted(words)
+        self.word_ids = {word: k for k, word in enumerate(self.words)}
+
+        # Bitsets of the words of each length, and of the words of each
+        # length with a given letter at a given position
+        lengths = collections.defaultdict(int)
+        index = collections.defaultdict(int)
+        for k, word in enumerate(self.words):
+            lengths[len(word)] |= 1 << k
+            for position, letter in enumerate(word):
+                index[len(word), position, letter] |= 1 << k
+        self.lengths = dict(lengths)
+        self.index = dict(index)
+
+        # Letters that appear at each (length, position)
+        letters = collections.defaultdict(list)
+        for length, position, letter in self.index:
+            letters[length, position].append(letter)
+        self.letters = dict(letters)
+
+
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, ordering="domwdeg", seed=0, restarts=True,
+                 propagation="mac", index=None):
         """
         Create new CSP crossword generate.
+
+        `ordering` is the variable ordering heuristic, either "domwdeg" or
+        "mrv". `seed` seeds the random tie-breaking between equally
+        constraining values. If `restarts` is True, the search restarts
+        after a number of failures that follows the Luby sequence.
+        `propagation` is either "mac", to maintain arc consistency after
+        each assignment, or "forward", to only revise the neighbors of the
+        assigned variable. `index` is a WordIndex to use instead of
+        building one from the crossword's words.
         """
+        if ordering not in ("domwdeg", "mrv"):
+            raise ValueError(f"unknown variable ordering {ordering!r}")
+        if propagation not in ("mac", "forward"):
+            raise ValueError(f"unknown propagation {propagation!r}")
         self.crossword = crossword
+        self.ordering = ordering
+        self.random = random.Random(seed)
+        self.restarts = restarts
+        self.propagation = propagation
+
+        # Preprocessed dictionary, possibly shared with other creators
+        if index is None:
+            index = WordIndex(self.crossword.words)
+        self.words = index.words
+        self.word_ids = index.word_ids
+        self.lengths = index.lengths
+        self.index = index.index
+        self.letters = index.letters
+
+        # Each domain is a bitset of word IDs, held in a Python int. Variables
+        # are kept in grid order so that seeded searches are reproducible.
         self.domains = {
-            var: self.crossword.words.copy()
-            for var in self.crossword.variables
+            var: (1 << len(self.words)) - 1
+            for var in sorted(
+                self.crossword.variables,
+                key=lambda var: (var.i, var.j, var.direction)
+            )
         }
 
+        # Undo trail of (variable, previous domain, previous reasons)
+        # triples, one per change
+        self.trail = []
+
+        # Assigned variables whose assignments caused the values missing
+        # from each domain to be removed
+        self.reasons = {var: frozenset() for var in self.crossword.variables}
+
+        # Reasons for the most recent domain wipe-out found by `ac3`
+        self.conflict = frozenset()
+
+        # Solutions already found, which must not be found again
+        self.blocked = NogoodStore(limit=None)
+
+        # Nogoods learned during search, and counts of the nodes explored,
+        # backjumps taken, failures in the current run and restarts made
+        self.nogoods = NogoodStore()
+        self.nodes = 0
+        self.backjumps = 0
+        self.failures = 0
+        self.restart_count = 0
+
+        # Failures allowed in the current run, or None for no limit
+        self.failure_limit = None
+
+        # Event that cancels the search once set, or None
+        self.stop = None
+
+        # Binary constraints on each variable, as (neighbor, i, j) triples
+        # where the variable's ith letter must equal the neighbor's jth
+        self.constraints = {
+            var: [
+                (neighbor, *self.crossword.overlaps[var, neighbor])
+                for neighbor in self.domains
+                if neighbor in self.crossword.neighbors(var)
+            ]
+            for var in self.domains
+        }
+
+        # Weight of the constraint between each pair of overlapping
+        # variables, increased each time it wipes out a domain
+        self.weights = {arc: 1 for arc in self.crossword.overlaps}
+
+        # Variable using each word in the assignment currently being searched
+        self.used = dict()
+
+    def values(self, var):
+        """
+        Return the list of words in the domain of `var`, in ID order.
+        """
+        return [self.words[k] for k in word_ids(self.domains[var])]
+
+    def domain_size(self, var):
+        """
+        Return the number of words in the domain of `var`.
+        """
+        return self.domains[var].bit_count()
+
+    def prune(self, var, domain, reasons=frozenset()):
+        """
+        Replace the domain of `var` with `domain`, recording the previous
+        domain on the undo trail. `reasons` are the assigned variables that
+        caused the values to be removed.
+        """
+        self.trail.append((var, self.domains[var], self.reasons[var]))
+        self.domains[var] = domain
+        if reasons:
+            self.reasons[var] = self.reasons[var] | reasons
+
+    def undo(self, mark):
+        """
+        Restore every domain changed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain, reasons = self.trail.pop()
+            self.domains[var] = domain
+            self.reasons[var] = reasons
+
+    def count_matching(self, var, position, letter):
+        """
+        Return how many words in the domain of `var` have `letter` at
+        `position`.
+        """
+        mask = self.index.get((var.length, position, letter), 0)
+        return (self.domains[var] & mask).bit_count()
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -34,14 +295,23 @@ class CrosswordCreator():
         """
         Print crossword assignment to the terminal.
         """
+        print(self.render(assignment))
+
+    def render(self, assignment):
+        """
+        Return crossword assignment as a string, one line per row.
+        """
         letters = self.letter_grid(assignment)
+        rows = []
         for i in range(self.crossword.height):
+            row = ""
             for j in range(self.crossword.width):
                 if self.crossword.structure[i][j]:
-                    print(letters[i][j] or " ", end="")
+                    row += letters[i][j] or " "
                 else:
-                    print("█", end="")
-            print()
+                    row += "█"
+            rows.append(row)
+        return "\n".join(rows)
 
     def save(self, assignment, filename):
         """
@@ -90,7 +360,51 @@ class CrosswordCreator():
         """
         self.enforce_node_consistency()
         self.ac3()
-        return self.backtrack(dict())
+        self.trail = []
+        self.nodes = 0
+        self.backjumps = 0
+        self.restart_count = 0
+        while True:
+            if self.restarts:
+                self.failure_limit = (
+                    luby(self.restart_count + 1) * RESTART_FAILURES
+                )
+            self.failures = 0
+            self.used = dict()
+            try:
+                return self.backtrack(dict())
+            except Restart:
+                self.undo(0)
+                self.restart_count += 1
+
+    def solutions(self, limit=None, distinct=False):
+        """
+        Yield solutions to the CSP one at a time, each different from every
+        solution before it, until there are no more or `limit` have been
+        yielded. If `distinct` is True, no word is used by more than one of
+        the yielded solutions.
+        """
+        count = 0
+        while limit is None or count < limit:
+            assignment = self.solve()
+            if assignment is None:
+                return
+            assignment = dict(assignment)
+            self.undo(0)
+            if distinct:
+                used = 0
+                for word in assignment.values():
+                    used |= 1 << self.word_ids[word]
+                for var in self.domains:
+                    self.domains[var] &= ~used
+            else:
+                self.blocked.add(assignment.items())
+            yield assignment
+            count += 1
+
+            # A grid with no variables has only the empty solution
+            if not assignment:
+                return
 
     def enforce_node_consistency(self):
         """
@@ -99,9 +413,7 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for var in self.domains:
-            for word in self.domains[var].copy():
-                if var.length != len(word):
-                    self.domains[var].remove(word)
+            self.domains[var] &= self.lengths.get(var.length, 0)
 
     def revise(self, x, y):
         """
@@ -112,21 +424,22 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revision = False
-
-        if (x, y) in self.crossword.overlaps:
-            i, j = self.crossword.overlaps[x, y]
-            for word in  self.domains[x].copy():
-                match = False
-                for word2 in self.domains[y]:
-                    if word[i] == word2[j]:
-                        match = True
-                        break
-                if not match:
-                    revision = True
-                    self.domains[x].remove(word)
-
-        return revision
+        overlap = self.crossword.overlaps[x, y]
+        if overlap is None:
+            return False
+        i, j = overlap
+
+        # Words of `x` whose ith letter some word of `y` has at position j
+        supported = 0
+        for letter in self.letters.get((x.length, i), ()):
+            if self.domains[y] & self.index.get((y.length, j, letter), 0):
+                supported |= self.index[x.length, i, letter]
+
+        domain = self.domains[x] & supported
+        if domain == self.domains[x]:
+            return False
+        self.prune(x, domain, self.reasons[y])
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -139,28 +452,50 @@ class CrosswordCreator():
         """
         if arcs is None: 
             arcs = []
-            for (x,y) in self.crossword.overlaps:
-                if self.crossword.overlaps[x, y]:
+            for x in self.domains:
+                for y, _, _ in self.constraints[x]:
                     arcs.append((x, y))
+        arcs = collections.deque(arcs)
 
         while arcs:
-            x, y = arcs.pop(0)
-            print(x, y)
+            x, y = arcs.popleft()
             if self.revise(x, y):
-                if len(self.domains[x]) == 0: return False
-                for z in self.crossword.neighbors(x):
+                if not self.domains[x]:
+                    self.wipe_out(x, y)
+                    return False
+                for z, _, _ in self.constraints[x]:
                     if z == y: continue
                     arcs.append((z, x))
 
         return True
 
+    def forward_check(self, arcs):
+        """
+        Revise each arc in `arcs` once, without propagating any changes
+        further.
+
+        Return True if no domains are empty; return False if one or more
+        domains end up empty.
+        """
+        for x, y in arcs:
+            if self.revise(x, y) and not self.domains[x]:
+                self.wipe_out(x, y)
+                return False
+        return True
+
+    def wipe_out(self, x, y):
+        """
+        Record that revising `x` against `y` left the domain of `x` empty.
+        """
+        self.conflict = self.reasons[x]
+        self.weights[x, y] += 1
+        self.weights[y, x] += 1
+
     def assignment_complete(self, assignment):
         """
         Return True if `assignment` is complete (i.e., assigns a value to each
         crossword variable); return False otherwise.
         """
-        if not assignment: return False
-
         for var in self.domains:
             if var not in assignment:
                 return False
@@ -172,57 +507,92 @@ class CrosswordCreator():
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
         """
-        for v1 in assignment:
-            for v2 in assignment:
-                if v1 == v2: continue
-                word1, word2 = assignment[v1], assignment[v2]
-                if len(word1) != v1.length or len(word2) != v2.length:
+        if len(set(assignment.values())) != len(assignment):
+            return False
+
+        for var, word in assignment.items():
+            if len(word) != var.length:
+                return False
+            for neighbor, i, j in self.constraints[var]:
+                if neighbor in assignment and word[i] != assignment[neighbor][j]:
                     return False
-                if self.crossword.overlaps[v1, v2]:
-                    i, j = self.crossword.overlaps[v1, v2]
-                    if word1[i] != word2[j]:
-                        return False
 
         return True
 
+    def conflicting(self, var, word, assignment):
+        """
+        Return None if assigning `word` to `var` is consistent with
+        `assignment`, which must already be consistent and must use exactly
+        the words in `self.used`. Otherwise, return the set of assigned
+        variables that conflict with it. Only the constraints on `var` are
+        checked.
+        """
+        if len(word) != var.length:
+            return set()
+        if word in self.used:
+            return {self.used[word]}
+
+        culprits = {
+            neighbor for neighbor, i, j in self.constraints[var]
+            if neighbor in assignment and word[i] != assignment[neighbor][j]
+        }
+        return culprits or None
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
         the number of values they rule out for neighboring variables.
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
+        Values that rule out equally many are shuffled.
         """
-        import heapq
-        min_heap = []
-        
-        for word in self.domains[var]:
-            cnt = 0
-            for neighbor in self.crossword.neighbors(var):
-                if neighbor in assignment: continue
-                assignment[var] = word
-                for word2 in self.domains[neighbor]:
-                    assignment[neighbor] = word2
-                    if not self.consistent(assignment):
-                        cnt+=1
-                assignment.pop(neighbor, None) 
-            heapq.heappush(min_heap, (cnt, word))
-        assignment.pop(var, None) 
-        
-        odv = []
+        neighbors = [
+            constraint for constraint in self.constraints[var]
+            if constraint[0] not in assignment
+        ]
 
-        while min_heap:
-            odv.append(heapq.heappop(min_heap)[1])
+        # Number of words each neighbor would lose, by overlapping letter
+        ruled_out = [dict() for _ in neighbors]
 
-        return odv
+        counts = dict()
+        for word in self.values(var):
+            cnt = 0
+            for (neighbor, i, j), cache in zip(neighbors, ruled_out):
+                letter = word[i]
+                if letter not in cache:
+                    cache[letter] = (
+                        self.domain_size(neighbor)
+                        - self.count_matching(neighbor, j, letter)
+                    )
+                cnt += cache[letter]
+            counts[word] = cnt
+
+        keys = {word: (counts[word], self.random.random()) for word in counts}
+        return sorted(counts, key=keys.__getitem__)
 
     def select_unassigned_variable(self, assignment):
         """
         Return an unassigned variable not already part of `assignment`.
-        Choose the variable with the minimum number of remaining values
-        in its domain. If there is a tie, choose the variable with the highest
-        degree. If there is a tie, any of the tied variables are acceptable
-        return values.
+
+        With the "domwdeg" ordering, choose the variable with the fewest
+        remaining values per unit of weighted degree: the total weight of
+        its constraints with unassigned variables.
+
+        With the "mrv" ordering, choose the variable with the minimum number
+        of remaining values in its domain. If there is a tie, choose the
+        variable with the highest degree. If there is a tie, any of the tied
+        variables are acceptable return values.
         """
+        if self.ordering == "domwdeg":
+            return min(
+                (var for var in self.domains if var not in assignment),
+                key=lambda var: (
+                    self.domain_size(var)
+                    / max(self.weighted_degree(var, assignment), 1)
+                ),
+                default=None
+            )
+
         min_domain_var = None
 
         for var in self.domains:
@@ -230,8 +600,8 @@ class CrosswordCreator():
                 if not min_domain_var:
                     min_domain_var = var
                     continue
-                min_length = len(self.domains[min_domain_var])
-                new_length = len(self.domains[var])
+                min_length = self.domain_size(min_domain_var)
+                new_length = self.domain_size(var)
                 if new_length < min_length:
                     min_domain_var = var
                 elif new_length == min_length:
@@ -240,6 +610,17 @@ class CrosswordCreator():
 
         return min_domain_var
 
+    def weighted_degree(self, var, assignment):
+        """
+        Return the total weight of the constraints between `var` and its
+        neighbors that are not in `assignment`.
+        """
+        return sum(
+            self.weights[var, neighbor]
+            for neighbor, _, _ in self.constraints[var]
+            if neighbor not in assignment
+        )
+
     def backtrack(self, assignment):
         """
         Using Backtracking Search, take as input a partial assignment for the
@@ -247,37 +628,187 @@ class CrosswordCreator():
 
         `assignment` is a mapping from variables (keys) to words (values).
 
+        After each assignment, arc consistency is maintained over the arcs
+        into the assigned variable. Domain changes are recorded on the undo
+        trail and rolled back when the assignment is undone. Dead ends
+        jump straight back to the most recent assignment that caused them.
+        Raises Restart once the current run's failure limit is exceeded.
+
+        Raises Cancelled if `self.stop` is set during the search.
+
         If no assignment is possible, return None.
         """
-        if self.assignment_complete(assignment): return assignment
+        solution, _ = self.backjump(assignment)
+        return solution
 
-        var = self.select_unassigned_variable(assignment)
+    def backjump(self, assignment):
+        """
+        Search for a complete assignment extending `assignment` with
+        conflict-directed backjumping, and return a pair (solution, conflict).
+
+        If there is no solution, `solution` is None and `conflict` is a set
+        of assigned variables whose current words together rule out every
+        extension. The search returns past any variable not in the conflict
+        without trying its remaining values, and records each conflict as a
+        nogood.
+        """
+        if self.assignment_complete(assignment): return assignment, set()
 
-        for word in self.domains[var]:
+        var = self.select_unassigned_variable(assignment)
+        conflict = set(self.reasons[var])
+
+        for word in self.order_domain_values(var, assignment):
+            culprits = self.conflicting(var, word, assignment)
+            if culprits is None:
+                culprits = self.nogoods.violated(var, word, assignment)
+            if culprits is None:
+                culprits = self.blocked.violated(var, word, assignment)
+            if culprits is not None:
+                conflict |= culprits
+                continue
+
+            self.nodes += 1
+            if (self.stop is not None and self.nodes % CANCEL_CHECK_NODES == 0
+                    and self.stop.is_set()):
+                raise Cancelled()
+            mark = len(self.trail)
             assignment[var] = word
-            if self.consistent(assignment):
-                res = self.backtrack(assignment)
-                if res: return res
-            assignment.pop(var, None)
+            self.used[word] = var
+            self.prune(var, 1 << self.word_ids[word], {var})
+            arcs = [
+                (neighbor, var)
+                for neighbor, _, _ in self.constraints[var]
+                if neighbor not in assignment
+            ]
+            if self.propagation == "mac":
+                consistent = self.ac3(arcs)
+            else:
+                consistent = self.forward_check(arcs)
+            if consistent:
+                solution, culprits = self.backjump(assignment)
+                if solution: return solution, culprits
+            else:
+                culprits = self.conflict
+            self.undo(mark)
+            del self.used[word]
+            del assignment[var]
+
+            self.failures += 1
+            if self.failure_limit is not None and self.failures > self.failure_limit:
+                raise Restart
+
+            if var not in culprits:
+                self.backjumps += 1
+                return None, culprits
+            conflict |= culprits
+            conflict.discard(var)
+
+        self.nogoods.add((v, assignment[v]) for v in conflict)
+        return None, conflict
+
+
+def portfolio(jobs, seed=0):
+    """
+    Return a list of `jobs` solver configurations, cycling through
+    PORTFOLIO and giving each job a different seed.
+    """
+    return [
+        dict(PORTFOLIO[k % len(PORTFOLIO)], seed=seed + k)
+        for k in range(jobs)
+    ]
+
+
+def _init_worker(crossword, index, stop):
+    """Stores the shared problem once per portfolio worker process."""
+    _worker["crossword"] = crossword
+    _worker["index"] = index
+    _worker["stop"] = stop
+
+
+def _solve_config(config):
+    """
+    Solves the worker's crossword with the solver configuration `config`.
+    Returns (assignment, counts), where counts are the nodes, backjumps and
+    restarts, or None if cancelled.
+    """
+    if _worker["stop"].is_set():
         return None
-
+    creator = CrosswordCreator(
+        _worker["crossword"], index=_worker["index"], **config
+    )
+    creator.stop = _worker["stop"]
+    try:
+        assignment = creator.solve()
+    except Cancelled:
+        return None
+    return assignment, (
+        creator.nodes, creator.backjumps, creator.restart_count
+    )
+
+
+def parallel_solve(crossword, jobs=None, index=None, seed=0):
+    """
+    Solve `crossword` by running a portfolio of `jobs` differently
+    configured solvers on a pool of worker processes, all sharing one
+    WordIndex. The first solver to finish wins and the others are
+    cancelled.
+
+    Return (assignment, config, counts) for the winning solver, where
+    `assignment` is None if the crossword has no solution.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if index is None:
+        index = WordIndex(crossword.words)
+    configs = portfolio(jobs, seed)
+
+    stop = multiprocessing.Event()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(crossword, index, stop)
+    ) as executor:
+        futures = {
+            executor.submit(_solve_config, config): config
+            for config in configs
+        }
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result is not None:
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+                assignment, counts = result
+                return assignment, futures[future], counts
 
 
 def main():
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
-
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    parser = argparse.ArgumentParser(description="Generate a crossword.")
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of differently configured solvers "
+                             "to race in parallel")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    output = args.output
 
     # Generate crossword
-    crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    crossword = Crossword(args.structure, args.words)
+    index = WordIndex(crossword.words)
+    creator = CrosswordCreator(crossword, seed=args.seed, index=index)
+    if args.jobs > 1:
+        assignment, config, counts = parallel_solve(
+            crossword, args.jobs, index, args.seed
+        )
+        print("Winning solver: " + ", ".join(
+            f"{key}={value}" for key, value in config.items()
+        ))
+    else:
+        assignment = creator.solve()
+        counts = creator.nodes, creator.backjumps, creator.restart_count
 
     # Print result
     if assignment is None:
@@ -286,6 +817,9 @@ def main():
         creator.print(assignment)
         if output:
             creator.save(assignment, output)
+    print("Explored {} nodes with {} backjumps and {} restarts.".format(
+        *counts
+    ))
 
 
 if __name__ == "__main__":
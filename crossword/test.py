@@ -0,0 +1,141 @@
+import os
+import random
+import tempfile
+
+from batch import is_structure
+from crossword import *
+from generate import *
+
+with open(os.path.join(os.path.dirname(__file__), "data", "words2.txt")) as f:
+    SHORT_WORDS = sorted(
+        word for word in f.read().upper().splitlines() if len(word) <= 4
+    )
+
+
+def random_crossword(seed, directory):
+    """
+    Returns a random crossword of at most 4x4 cells with a small random
+    vocabulary, writing its structure file in `directory`.
+    """
+    rng = random.Random(seed)
+    height, width = rng.randint(2, 4), rng.randint(2, 4)
+    path = os.path.join(directory, f"structure{seed}.txt")
+    with open(path, "w") as f:
+        for _ in range(height):
+            f.write("".join(
+                "_" if rng.random() < 0.6 else "#" for _ in range(width)
+            ) + "\n")
+    return Crossword(path, words=set(rng.sample(SHORT_WORDS, 150)))
+
+
+def brute_force(crossword):
+    """Returns every solution of `crossword`, by enumeration."""
+    variables = list(crossword.variables)
+    solutions = []
+
+    def extend(assignment):
+        if len(assignment) == len(variables):
+            solutions.append(dict(assignment))
+            return
+        var = variables[len(assignment)]
+        for word in crossword.words:
+            if len(word) != var.length or word in assignment.values():
+                continue
+            if all(
+                word[crossword.overlaps[var, other][0]]
+                == assignment[other][crossword.overlaps[var, other][1]]
+                for other in assignment
+                if crossword.overlaps[var, other] is not None
+            ):
+                assignment[var] = word
+                extend(assignment)
+                del assignment[var]
+
+    extend(dict())
+    return solutions
+
+
+def valid(crossword, assignment):
+    """Returns True if `assignment` is a solution of `crossword`."""
+    return (
+        set(assignment) == crossword.variables
+        and len(set(assignment.values())) == len(assignment)
+        and all(
+            word in crossword.words and len(word) == var.length
+            for var, word in assignment.items()
+        )
+        and all(
+            assignment[x][crossword.overlaps[x, y][0]]
+            == assignment[y][crossword.overlaps[x, y][1]]
+            for x in assignment for y in crossword.neighbors(x)
+        )
+    )
+
+
+def as_set(assignments):
+    return {frozenset(assignment.items()) for assignment in assignments}
+
+
+def random_crosswords(count):
+    """Yields (seed, crossword) for random crosswords of a few variables."""
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in range(count):
+            crossword = random_crossword(seed, directory)
+            if len(crossword.variables) <= 5:
+                yield seed, crossword
+
+
+def test_portfolio():
+    for seed, crossword in random_crosswords(100):
+        solvable = bool(brute_force(crossword))
+        for config in portfolio(len(PORTFOLIO), seed=seed):
+            assignment = CrosswordCreator(crossword, **config).solve()
+            if solvable:
+                assert assignment is not None, (seed, config)
+                assert valid(crossword, assignment), (seed, config)
+            else:
+                assert assignment is None, (seed, config)
+
+
+def test_solutions():
+    for seed, crossword in random_crosswords(100):
+        expected = brute_force(crossword)
+        found = list(CrosswordCreator(crossword, seed=seed).solutions())
+        assert len(found) == len(expected), seed
+        assert as_set(found) == as_set(expected), seed
+
+        # Distinct solutions share no words
+        used = set()
+        creator = CrosswordCreator(crossword, seed=seed)
+        for assignment in creator.solutions(distinct=True):
+            assert valid(crossword, assignment), seed
+            assert not used & set(assignment.values()), seed
+            used.update(assignment.values())
+
+
+def test_parallel_solve():
+    crossword = Crossword("data/structure1.txt", "data/words1.txt")
+    assignment, config, counts = parallel_solve(crossword, jobs=2)
+    assert valid(crossword, assignment), config
+
+
+def test_empty_grid():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "structure.txt")
+        with open(path, "w") as f:
+            f.write("#_#\n_#_\n")
+        crossword = Crossword(path, words={"CAT", "DOG"})
+        assert not crossword.variables
+        assert CrosswordCreator(crossword).solve() == dict()
+        assert list(CrosswordCreator(crossword).solutions()) == [dict()]
+
+        assert is_structure(path)
+        assert not is_structure("data/words0.txt")
+
+
+if __name__ == "__main__":
+    test_empty_grid()
+    test_portfolio()
+    test_solutions()
+    test_parallel_solve()
+    print("All tests passed.")
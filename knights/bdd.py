@@ -0,0 +1,446 @@
+from logic import (
+    And, Biconditional, Implication, Not, Or, Symbol, branching_order,
+    children, postorder
+)
+
+# Default maximum number of live nodes a BDD may hold before giving up
+NODE_LIMIT = 100000
+
+# Node ids of the two terminal nodes
+FALSE = 0
+TRUE = 1
+
+# Boolean operators that can be applied to two BDDs
+OPERATORS = {
+    "and": lambda a, b: a and b,
+    "or": lambda a, b: a or b,
+    "xor": lambda a, b: a != b,
+    "iff": lambda a, b: a == b,
+    "implies": lambda a, b: (not a) or b,
+}
+
+
+class NodeLimitExceeded(Exception):
+    """Raised when a BDD grows beyond its node limit."""
+
+
+def variable_order(sentence, heuristic="appearance"):
+    """
+    Returns a list of the symbols in `sentence` in the order they should
+    appear in a BDD, from the root down.
+
+    `heuristic` is either "appearance", which orders symbols by their first
+    occurrence in a depth-first walk of the sentence so that symbols used
+    together stay close together, or "occurrence", which puts the most
+    frequently occurring symbols first.
+    """
+    if heuristic == "occurrence":
+        return list(reversed(branching_order(sentence)))
+    if heuristic != "appearance":
+        raise ValueError(f"unknown variable ordering {heuristic!r}")
+
+    order = []
+    seen_symbols = set()
+    seen_nodes = set()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if node in seen_nodes:
+            continue
+        seen_nodes.add(node)
+        if isinstance(node, Symbol):
+            if node.name not in seen_symbols:
+                seen_symbols.add(node.name)
+                order.append(node.name)
+        else:
+            stack.extend(reversed(children(node)))
+    return order
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagram manager.
+
+    Nodes are integer ids shared by every function built in the same
+    manager. A unique table guarantees that no two nodes have the same
+    variable and children, and results of `apply` are cached, so equal
+    functions are always represented by the same id.
+
+    `node_limit` bounds the number of live nodes. When an operation runs
+    into it, nodes no longer reachable from a compiled sentence are garbage
+    collected and the operation is retried. Collection renumbers nodes, so
+    only nodes of compiled sentences survive it: look them up again with
+    `compile`, which returns cached nodes at no cost.
+    """
+
+    def __init__(self, order=(), node_limit=NODE_LIMIT):
+
+        # Variable order, and the level of each variable within it
+        self.order = []
+        self.levels = dict()
+        for name in order:
+            self.add_variable(name)
+        self.node_limit = node_limit
+
+        # Level, low child and high child of each node, by id
+        self.level = [None, None]
+        self.low = [None, None]
+        self.high = [None, None]
+
+        # Unique table and operation caches
+        self.unique = dict()
+        self.apply_cache = dict()
+        self.compile_cache = dict()
+
+        # Intermediate results that collecting garbage must keep, and the
+        # number of garbage collections so far
+        self.pinned = []
+        self.collections = 0
+
+    def __len__(self):
+        return len(self.level)
+
+    def copy(self):
+        """
+        Returns a new manager with the same variables and nodes, so that
+        nodes built in either one do not count against the other's limit.
+        """
+        bdd = BDD(self.order, node_limit=self.node_limit)
+        bdd.level = list(self.level)
+        bdd.low = list(self.low)
+        bdd.high = list(self.high)
+        bdd.unique = dict(self.unique)
+        bdd.compile_cache = dict(self.compile_cache)
+        return bdd
+
+    def mark(self):
+        """
+        Returns a marker of the manager's current size, for `rollback`.
+        """
+        return (
+            len(self.level), len(self.order), len(self.unique),
+            len(self.apply_cache), len(self.compile_cache), self.collections
+        )
+
+    def rollback(self, mark):
+        """
+        Discards every node, variable and cached result added since `mark`
+        was taken. Nodes built since then must no longer be used.
+        """
+        nodes, variables, unique, applied, compiled, collections = mark
+
+        # Dicts keep insertion order, so the newest entries are last
+        while len(self.compile_cache) > compiled:
+            self.compile_cache.popitem()
+        for name in self.order[variables:]:
+            del self.levels[name]
+        del self.order[variables:]
+
+        # Nodes were renumbered since the mark, so collect the new ones
+        if self.collections != collections:
+            self.collect()
+            return
+
+        del self.level[nodes:]
+        del self.low[nodes:]
+        del self.high[nodes:]
+        for table, size in ((self.unique, unique),
+                            (self.apply_cache, applied)):
+            while len(table) > size:
+                table.popitem()
+
+    def collect(self, roots=()):
+        """
+        Discards every node not reachable from a compiled sentence, a pinned
+        node or `roots`, renumbering the rest, and returns the new ids of
+        `roots`. Clears the apply cache.
+        """
+        live = {FALSE, TRUE}
+        stack = list(self.compile_cache.values()) + self.pinned + list(roots)
+        while stack:
+            u = stack.pop()
+            if u not in live:
+                live.add(u)
+                stack.append(self.low[u])
+                stack.append(self.high[u])
+
+        # Children always have smaller ids than their parents, so keeping
+        # the order of ids keeps every child ahead of its parents
+        renumber = {FALSE: FALSE, TRUE: TRUE}
+        level, low, high = [None, None], [None, None], [None, None]
+        self.unique = dict()
+        for u in sorted(live - {FALSE, TRUE}):
+            renumber[u] = len(level)
+            key = (self.level[u], renumber[self.low[u]],
+                   renumber[self.high[u]])
+            level.append(key[0])
+            low.append(key[1])
+            high.append(key[2])
+            self.unique[key] = renumber[u]
+        self.level, self.low, self.high = level, low, high
+
+        # Update the compile cache in place, as `compile` may be using it
+        self.apply_cache = dict()
+        for sentence, u in self.compile_cache.items():
+            self.compile_cache[sentence] = renumber[u]
+        self.pinned[:] = [renumber[u] for u in self.pinned]
+        self.collections += 1
+        return [renumber[u] for u in roots]
+
+    def add_variable(self, name):
+        """Adds `name` below every existing variable, if not yet present."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+
+    def node_level(self, u):
+        """Returns the level of node `u`; terminals lie below every level."""
+        return len(self.order) if u <= TRUE else self.level[u]
+
+    def make(self, level, low, high):
+        """Returns the unique node testing `level` with the given children."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            if len(self.level) >= self.node_limit:
+                raise NodeLimitExceeded(
+                    f"BDD exceeded {self.node_limit} nodes"
+                )
+            u = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = u
+        return u
+
+    def variable(self, name):
+        """Returns the node representing the single variable `name`."""
+        self.add_variable(name)
+        try:
+            return self.make(self.levels[name], FALSE, TRUE)
+        except NodeLimitExceeded:
+            self.collect()
+            return self.make(self.levels[name], FALSE, TRUE)
+
+    def apply(self, op, u, v):
+        """
+        Returns the node for `u op v`, where `op` is a key of OPERATORS.
+        If the node limit is reached, collects garbage and tries once more.
+        """
+        try:
+            return self._apply(op, u, v)
+        except NodeLimitExceeded:
+            u, v = self.collect((u, v))
+            return self._apply(op, u, v)
+
+    def _apply(self, op, u, v):
+        """
+        Returns the node for `u op v`, without collecting garbage. Keeps its
+        own stack instead of recursing, so a diagram may have any number of
+        levels.
+        """
+        # Pairs of nodes still to combine, or levels whose two children are
+        # on top of `results` once every pair pushed above them is done
+        stack = [(u, v, None)]
+        results = []
+        while stack:
+            u, v, level = stack.pop()
+            if level is not None:
+                high = results.pop()
+                low = results.pop()
+                result = self.make(level, low, high)
+                self.apply_cache[op, u, v] = result
+                results.append(result)
+                continue
+
+            result = self._shortcut(op, u, v)
+            if result is not None:
+                results.append(result)
+                continue
+
+            level = min(self.node_level(u), self.node_level(v))
+            u_low, u_high = self.cofactors(u, level)
+            v_low, v_high = self.cofactors(v, level)
+            stack.append((u, v, level))
+            stack.append((u_high, v_high, None))
+            stack.append((u_low, v_low, None))
+        return results.pop()
+
+    def _shortcut(self, op, u, v):
+        """
+        Returns the node for `u op v` if it is trivial or cached, and None
+        otherwise.
+        """
+        if u <= TRUE and v <= TRUE:
+            return int(OPERATORS[op](bool(u), bool(v)))
+        if op == "and":
+            if u == FALSE or v == FALSE:
+                return FALSE
+            if u == TRUE or u == v:
+                return v
+            if v == TRUE:
+                return u
+        elif op == "or":
+            if u == TRUE or v == TRUE:
+                return TRUE
+            if u == FALSE or u == v:
+                return v
+            if v == FALSE:
+                return u
+        return self.apply_cache.get((op, u, v))
+
+    def cofactors(self, u, level):
+        """Returns the (low, high) cofactors of `u` with respect to `level`."""
+        if self.node_level(u) == level:
+            return self.low[u], self.high[u]
+        return u, u
+
+    def negate(self, u):
+        """Returns the node for the negation of `u`."""
+        return self.apply("xor", u, TRUE)
+
+    def compile(self, sentence):
+        """Returns the node representing logical sentence `sentence`."""
+        return postorder(
+            sentence, children, self._compile_node, self.compile_cache
+        )
+
+    def _compile_node(self, sentence, parts):
+        """Returns the node for `sentence` given the nodes of its children."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return self.negate(parts[0])
+        if isinstance(sentence, (And, Or)):
+            op = "and" if isinstance(sentence, And) else "or"
+            if not parts:
+                return TRUE if op == "and" else FALSE
+            return self._fold(op, parts)
+        if isinstance(sentence, Implication):
+            return self.apply("implies", *parts)
+        if isinstance(sentence, Biconditional):
+            return self.apply("iff", *parts)
+        raise TypeError("must be a logical sentence")
+
+    def _fold(self, op, parts):
+        """
+        Returns the node for `op` applied across `parts`, combining
+        neighbouring pairs in rounds so that each apply joins two results
+        of similar size, which keeps long chains of constraints from
+        rebuilding one ever-growing result. Partial results are pinned, as
+        collecting garbage renumbers them.
+        """
+        work = self.pinned
+        base = len(work)
+        work.extend(parts)
+        try:
+            while len(work) - base > 1:
+                end = len(work)
+                kept = base
+                for i in range(base, end - 1, 2):
+                    work[kept] = self.apply(op, work[i], work[i + 1])
+                    kept += 1
+                if (end - base) % 2:
+                    work[kept] = work[end - 1]
+                    kept += 1
+                del work[kept:]
+            return work[base]
+        finally:
+            del work[base:]
+
+    def entails(self, u, v):
+        """
+        Checks if every model of `u` is also a model of `v`, by searching
+        the pairs of cofactors for a model of `u` but not `v` without
+        building any nodes.
+        """
+        seen = set()
+        stack = [(u, v)]
+        while stack:
+            u, v = stack.pop()
+            if u == FALSE or v == TRUE or u == v or (u, v) in seen:
+                continue
+            if u == TRUE and v == FALSE:
+                return False
+            seen.add((u, v))
+            level = min(self.node_level(u), self.node_level(v))
+            u_low, u_high = self.cofactors(u, level)
+            v_low, v_high = self.cofactors(v, level)
+            stack.append((u_low, v_low))
+            stack.append((u_high, v_high))
+        return True
+
+    def count(self, u, symbols=None):
+        """
+        Returns the number of models of `u` over `symbols`, which defaults
+        to every variable in the manager. `symbols` must include every
+        variable `u` depends on.
+        """
+        total = len(self.order)
+
+        def count(u, parts):
+            """Returns the models of `u` over the levels from its own down."""
+            level = self.level[u]
+            low_models, high_models = parts
+            return (
+                low_models << (self.node_level(self.low[u]) - level - 1)
+            ) + (
+                high_models << (self.node_level(self.high[u]) - level - 1)
+            )
+
+        models = postorder(
+            u,
+            lambda u: (self.low[u], self.high[u]) if u > TRUE else (),
+            count,
+            {FALSE: 0, TRUE: 1}
+        ) << self.node_level(u)
+        if symbols is not None:
+            models >>= total - len(set(symbols) & set(self.order))
+            models <<= len(set(symbols) - set(self.order))
+        return models
+
+    def satisfying_models(self, u):
+        """
+        Yields every model of `u` as a dict over the manager's variables.
+        """
+        total = len(self.order)
+
+        # Each entry assigns `value` to the variable above `level` and
+        # continues from node `u`; `values` holds the current path
+        values = []
+        stack = [(u, 0, None)]
+        while stack:
+            u, level, value = stack.pop()
+            if value is not None:
+                del values[level - 1:]
+                values.append(value)
+            if u == FALSE:
+                continue
+            if level == total:
+                yield dict(zip(self.order, values))
+                continue
+            if self.node_level(u) == level:
+                low, high = self.low[u], self.high[u]
+            else:
+                low = high = u
+            stack.append((low, level + 1, False))
+            stack.append((high, level + 1, True))
+
+
+def compile_sentence(sentence, order="appearance", node_limit=NODE_LIMIT):
+    """
+    Compiles `sentence` into a new BDD manager and returns (bdd, node).
+
+    `order` is either a variable ordering heuristic understood by
+    `variable_order` or an explicit list of symbol names.
+    """
+    if isinstance(order, str):
+        order = variable_order(sentence, order)
+    bdd = BDD(order, node_limit=node_limit)
+    bdd.compile(sentence)
+
+    # Drop the intermediate results of compiling
+    bdd.collect()
+    return bdd, bdd.compile(sentence)
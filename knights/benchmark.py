@@ -0,0 +1,68 @@
+import random
+import sys
+import time
+
+from logic import *
+
+
+def scaled_puzzle(n):
+    """
+    Returns a knights and knaves knowledge base about `n` characters, built
+    the way generated knowledge bases are: each rule is nested inside the
+    previous conjunction, and the basic rules are restated for every
+    statement that mentions a character.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(n)]
+
+    def rules(i):
+        return And(
+            Not(And(knights[i], knaves[i])),
+            Or(knights[i], knaves[i])
+        )
+
+    knowledge = And()
+    for i in range(n):
+        j = (i + 1) % n
+
+        # Character i says "We are the same kind" about character i + 1
+        statement = Or(
+            And(knights[i], knights[j]), And(knaves[i], knaves[j])
+        )
+        knowledge = And(
+            knowledge, rules(i), rules(j),
+            Implication(knights[i], statement),
+            Implication(knaves[i], Not(Not(Not(statement))))
+        )
+    return knowledge
+
+
+def time_evaluations(sentence, models):
+    """Returns the seconds taken to evaluate `sentence` in every model."""
+    start = time.perf_counter()
+    for model in models:
+        sentence.evaluate(model)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [3, 10, 30, 100]
+    random.seed(0)
+    print("characters  nodes  simplified  evaluate  simplified  speedup")
+    for n in sizes:
+        knowledge = scaled_puzzle(n)
+        simplified = simplify(knowledge)
+        symbols = sorted(knowledge.symbols())
+        models = [
+            {symbol: random.random() < 0.5 for symbol in symbols}
+            for _ in range(2000)
+        ]
+        before = time_evaluations(knowledge, models)
+        after = time_evaluations(simplified, models)
+        print(f"{n:>10}  {len(serialize(knowledge)):>5}  "
+              f"{len(serialize(simplified)):>10}  "
+              f"{before:>7.3f}s  {after:>9.3f}s  {before / after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
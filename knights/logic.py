@@ -1,19 +1,180 @@
+import concurrent.futures
 import itertools
+import math
+import multiprocessing
+import os
+import weakref
+
+from collections import Counter
 
 
 class Sentence():
+    """
+    Base class for logical sentences.
+
+    Sentences are immutable and hash-consed: constructing a sentence that is
+    structurally equal to one that already exists returns the existing object.
+    Equality is therefore identity, and each node computes its hash once on
+    construction and its symbol set and formula string once on first use.
+
+    Evaluation, symbol collection and formula construction walk the sentence
+    with an explicit stack, so arbitrarily deep sentences never reach
+    Python's recursion limit.
+    """
+
+    __slots__ = ("_hash", "_symbols", "_formula", "__weakref__")
+
+    # Tag mixed into the hash, and names of the child fields of each node
+    _tag = "sentence"
+    _fields = ()
+
+    # Table of every live sentence, keyed by (class, field values)
+    _table = weakref.WeakValueDictionary()
+
+    @classmethod
+    def _intern(cls, *values):
+        """Returns the unique sentence of this class with the given fields."""
+        key = (cls, values)
+        node = Sentence._table.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for field, value in zip(cls._fields, values):
+                object.__setattr__(node, field, value)
+            object.__setattr__(node, "_hash", hash((cls._tag,) + values))
+            object.__setattr__(node, "_symbols", None)
+            object.__setattr__(node, "_formula", None)
+            Sentence._table[key] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError("logical sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), tuple(
+            getattr(self, field) for field in type(self)._fields
+        ))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
-        raise Exception("nothing to evaluate")
+        return _evaluate(self, model, partial=False)
+
+    def partial_evaluate(self, model):
+        """
+        Evaluates the logical sentence under a partial model.
+        Returns True or False if the assigned symbols decide the sentence,
+        or None if its value still depends on unassigned symbols.
+        """
+        return _evaluate(self, model, partial=True)
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        if self._formula is None:
+            if any("(" in name or ")" in name for name in self.symbols()):
+                formula = self._joined_formula()
+            else:
+                formula = self._streamed_formula()
+            object.__setattr__(self, "_formula", formula)
+        return self._formula
+
+    def _streamed_formula(self):
+        """
+        Returns the formula by walking the sentence once with an explicit
+        stack, appending tokens to a single list that is joined at the end,
+        so memory stays linear in the length of the formula. Whether each
+        subformula needs parentheses is decided from its structure, which
+        matches `parenthesize` as long as no symbol name has parentheses.
+        """
+        wraps = dict()
+        postorder(
+            self, children, lambda node, parts: node._wraps(parts), wraps
+        )
+        tokens = []
+        stack = [iter([(self, False)])]
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:
+                stack.pop()
+            elif isinstance(item, str):
+                tokens.append(item)
+            else:
+                node, parenthesize = item
+                if parenthesize and wraps[node]:
+                    tokens.append("(")
+                    stack.append(iter(")"))
+                if node._formula is not None:
+                    tokens.append(node._formula)
+                else:
+                    stack.append(iter(node._layout()))
+        return "".join(tokens)
+
+    def _joined_formula(self):
+        """
+        Returns the formula by building and parenthesizing the formula
+        string of every subsentence.
+        """
+        return postorder(
+            self,
+            lambda node: () if node._formula is not None
+            else children(node),
+            lambda node, parts: node._formula if node._formula is not None
+            else node._make_formula(parts)
+        )
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        if self._symbols is None:
+            names = set()
+            seen = {self}
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if node._symbols is not None:
+                    names.update(node._symbols)
+                elif isinstance(node, Symbol):
+                    names.add(node.name)
+                else:
+                    for child in children(node):
+                        if child not in seen:
+                            seen.add(child)
+                            stack.append(child)
+            object.__setattr__(self, "_symbols", frozenset(names))
+        return self._symbols
+
+    def simplify(self):
+        """Returns a smaller equivalent sentence; see `simplify`."""
+        return simplify(self)
+
+    def _make_formula(self, parts):
+        """Returns the formula of this node given its children's formulas."""
+        return ""
+
+    def _layout(self):
+        """
+        Returns the pieces of this node's formula in order: strings, and
+        (child, parenthesize) pairs for each child's formula.
+        """
+        return []
+
+    def _wraps(self, parts):
+        """
+        Checks if `parenthesize` would wrap this node's formula, given the
+        same for each of its children.
+        """
+        return False
+
+    def _combine(self, values):
+        """
+        Returns the three-valued truth value of this node given the values
+        of its children, which stop early if `_short_circuits` said so.
+        """
+        raise Exception("nothing to evaluate")
+
+    def _short_circuits(self, index, value):
+        """Checks if child `index` having `value` decides this node."""
+        return False
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +205,12 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    __slots__ = ("name",)
+    _tag = "symbol"
+    _fields = ("name",)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls._intern(name)
 
     def __repr__(self):
         return self.name
@@ -62,50 +221,62 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
-        return self.name
+    def partial_evaluate(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
 
     def symbols(self):
-        return {self.name}
+        return frozenset((self.name,))
+
+    def _make_formula(self, parts):
+        return self.name
+
+    def _layout(self):
+        return [self.name]
+
+    def _wraps(self, parts):
+        return Sentence.parenthesize(self.name) != self.name
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
+    _tag = "not"
+    _fields = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls._intern(operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def _combine(self, values):
+        return None if values[0] is None else not values[0]
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def _make_formula(self, parts):
+        return "¬" + Sentence.parenthesize(parts[0])
 
-    def symbols(self):
-        return self.operand.symbols()
+    def _layout(self):
+        return ["¬", (self.operand, True)]
+
+    def _wraps(self, parts):
+        return True
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+
+    __slots__ = ("conjuncts",)
+    _tag = "and"
+    _fields = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return cls._intern(tuple(conjuncts))
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,150 +285,895 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        """
+        Sentences are immutable, so conjuncts cannot be added in place.
+        Raises an error pointing to `And(*sentence.conjuncts, conjunct)`,
+        which builds the extended conjunction.
+        """
+        raise TypeError(
+            "logical sentences are immutable; "
+            "use And(*sentence.conjuncts, conjunct) instead of add"
+        )
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def _short_circuits(self, index, value):
+        return value is False
 
-    def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+    def _combine(self, values):
+        if False in values:
+            return False
+        if None in values:
+            return None
+        return True
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def _make_formula(self, parts):
+        if len(parts) == 1:
+            return parts[0]
+        return " ∧ ".join([Sentence.parenthesize(part) for part in parts])
+
+    def _layout(self):
+        return _joined_layout(self.conjuncts, " ∧ ")
+
+    def _wraps(self, parts):
+        return parts[0] if len(parts) == 1 else len(parts) > 1
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+    _tag = "or"
+    _fields = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls._intern(tuple(disjuncts))
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def _short_circuits(self, index, value):
+        return value is True
 
-    def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+    def _combine(self, values):
+        if True in values:
+            return True
+        if None in values:
+            return None
+        return False
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def _make_formula(self, parts):
+        if len(parts) == 1:
+            return parts[0]
+        return " ∨  ".join([Sentence.parenthesize(part) for part in parts])
+
+    def _layout(self):
+        return _joined_layout(self.disjuncts, " ∨  ")
+
+    def _wraps(self, parts):
+        return parts[0] if len(parts) == 1 else len(parts) > 1
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    __slots__ = ("antecedent", "consequent")
+    _tag = "implies"
+    _fields = ("antecedent", "consequent")
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __new__(cls, antecedent, consequent):
+        Sentence.validate(antecedent)
+        Sentence.validate(consequent)
+        return cls._intern(antecedent, consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def _short_circuits(self, index, value):
+        return index == 0 and value is False
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
+    def _combine(self, values):
+        antecedent = values[0]
+        if antecedent is False:
+            return True
+        consequent = values[1]
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
+    def _make_formula(self, parts):
+        antecedent = Sentence.parenthesize(parts[0])
+        consequent = Sentence.parenthesize(parts[1])
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def _layout(self):
+        return [(self.antecedent, True), " => ", (self.consequent, True)]
+
+    def _wraps(self, parts):
+        return True
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+    __slots__ = ("left", "right")
+    _tag = "biconditional"
+    _fields = ("left", "right")
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __new__(cls, left, right):
+        Sentence.validate(left)
+        Sentence.validate(right)
+        return cls._intern(left, right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def _short_circuits(self, index, value):
+        return value is None
 
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+    def _combine(self, values):
+        if None in values:
+            return None
+        return values[0] == values[1]
+
+    def _make_formula(self, parts):
+        left = Sentence.parenthesize(parts[0])
+        right = Sentence.parenthesize(parts[1])
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def _layout(self):
+        return [(self.left, True), " <=> ", (self.right, True)]
+
+    def _wraps(self, parts):
+        return True
+
+
+def _joined_layout(operands, separator):
+    """
+    Returns the formula layout of `operands` joined by `separator`, with
+    a single operand left unparenthesized, as in And and Or.
+    """
+    if len(operands) == 1:
+        return [(operands[0], False)]
+    layout = []
+    for operand in operands:
+        if layout:
+            layout.append(separator)
+        layout.append((operand, True))
+    return layout
+
+
+def _evaluate(sentence, model, partial):
+    """
+    Evaluates `sentence` in `model` without recursion. If `partial`, symbols
+    missing from `model` are unknown and the result may be None; otherwise a
+    missing symbol is an error.
+    """
+
+    def leaf(symbol):
+        if partial:
+            return symbol.partial_evaluate(model)
+        return symbol.evaluate(model)
+
+    if isinstance(sentence, Symbol):
+        return leaf(sentence)
+
+    # Each frame holds a node, its children and the values found so far
+    values = dict()
+    stack = [(sentence, children(sentence), [])]
+    while True:
+        node, kids, parts = stack[-1]
+        index = len(parts)
+        if index < len(kids) and not (
+            index and node._short_circuits(index - 1, parts[-1])
+        ):
+            child = kids[index]
+            if child in values:
+                parts.append(values[child])
+            elif isinstance(child, Symbol):
+                parts.append(leaf(child))
+            else:
+                stack.append((child, children(child), []))
+            continue
+
+        value = node._combine(parts)
+        values[node] = value
+        stack.pop()
+        if not stack:
+            return value
+        stack[-1][2].append(value)
+
+
+def postorder(root, expand, combine, results=None):
+    """
+    Returns combine(key, [results of expand(key)]) for `root`, computing the
+    results of every key reachable through `expand` first, children before
+    parents, without recursion. Each key is combined only once; `results`
+    may be passed in to share combined keys between calls.
+    """
+    if results is None:
+        results = dict()
+    stack = [(root, False)]
+    while stack:
+        key, expanded = stack.pop()
+        if key in results:
+            continue
+        if expanded:
+            results[key] = combine(key, [results[child]
+                                         for child in expand(key)])
+        else:
+            stack.append((key, True))
+            for child in expand(key):
+                if child not in results:
+                    stack.append((child, False))
+    return results[root]
+
+
+def symbol_occurrences(sentence):
+    """
+    Returns a Counter mapping each symbol name in `sentence` to the number
+    of distinct subsentences it occurs in directly.
+    """
+    occurrences = Counter()
+    seen = {sentence}
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Symbol):
+            occurrences[node.name] += 1
+        for child in children(node):
+            if isinstance(child, Symbol):
+                occurrences[child.name] += 1
+            elif child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return occurrences
+
+
+def children(sentence):
+    """Returns a tuple of the immediate subsentences of `sentence`."""
+    if isinstance(sentence, Not):
+        return (sentence.operand,)
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return (sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, Biconditional):
+        return (sentence.left, sentence.right)
+    return ()
+
+
+def branching_order(*sentences):
+    """
+    Returns a list of all symbols in `sentences`, ordered from least to most
+    frequently occurring, so that popping from the end branches on the most
+    constrained symbol first.
+    """
+    occurrences = Counter()
+    symbols = frozenset()
+    for sentence in sentences:
+        occurrences.update(symbol_occurrences(sentence))
+        symbols |= sentence.symbols()
+    return sorted(symbols, key=lambda symbol: occurrences[symbol])
+
+
+def simplify(sentence):
+    """
+    Returns a sentence equivalent to `sentence` in negation normal form:
+    negations are pushed inward onto symbols, implications become
+    disjunctions, nested conjunctions and disjunctions are flattened and
+    their duplicate operands removed. Tautologies fold to And() and
+    contradictions to Or(), the empty conjunction and disjunction.
+    """
+    true, false = And(), Or()
+    cache = dict()
+
+    def complement(node):
+        return node.operand if isinstance(node, Not) else Not(node)
+
+    def junction(cls, parts):
+        identity, absorbing = (true, false) if cls is And else (false, true)
+        operands = dict()
+        for part in parts:
+            if part is absorbing:
+                return absorbing
+            if isinstance(part, cls):
+                operands.update(dict.fromkeys(children(part)))
+            elif part is not identity:
+                operands[part] = None
+        for operand in operands:
+            if isinstance(operand, Not) and operand.operand in operands:
+                return absorbing
+        if len(operands) == 1:
+            return next(iter(operands))
+        return cls(*operands)
+
+    def biconditional(left, right):
+        if left is right:
+            return true
+        if left is complement(right):
+            return false
+        for a, b in ((left, right), (right, left)):
+            if a is true:
+                return b
+            if a is false:
+                return visit(b, True)
+        return Biconditional(left, right)
+
+    def kind(key):
+        """Returns the junction a key simplifies to, or None."""
+        node, negated = key
+        if isinstance(node, (And, Or)):
+            return And if isinstance(node, And) != negated else Or
+        if isinstance(node, Implication):
+            return And if negated else Or
+        return None
+
+    def operands(key):
+        """Returns the (subsentence, negated) pairs a key depends on."""
+        node, negated = key
+        if isinstance(node, Not):
+            return ((node.operand, not negated),)
+        if isinstance(node, (And, Or)):
+            return tuple((child, negated) for child in children(node))
+        if isinstance(node, Implication):
+            return ((node.antecedent, not negated),
+                    (node.consequent, negated))
+        if isinstance(node, Biconditional):
+            return ((node.left, False), (node.right, negated))
+        return ()
+
+    def expand(key):
+        """
+        Returns the keys a key depends on. The operands of nested junctions
+        of the same kind are taken in directly, in order and once each, so
+        a long chain of them is flattened in a single pass.
+        """
+        cls = kind(key)
+        if cls is None:
+            return operands(key)
+        flattened = []
+        seen = set()
+        stack = [key]
+        while stack:
+            child = stack.pop()
+            if child in seen:
+                continue
+            seen.add(child)
+            if kind(child) is cls:
+                stack.extend(reversed(operands(child)))
+            else:
+                flattened.append(child)
+        return tuple(flattened)
+
+    def combine(key, parts):
+        node, negated = key
+        if isinstance(node, Symbol):
+            return Not(node) if negated else node
+        if isinstance(node, Not):
+            return parts[0]
+        if isinstance(node, (And, Or)):
+            return junction(
+                And if isinstance(node, And) != negated else Or, parts
+            )
+        if isinstance(node, Implication):
+            return junction(And if negated else Or, parts)
+        if isinstance(node, Biconditional):
+            return biconditional(*parts)
+        raise TypeError("must be a logical sentence")
+
+    def visit(node, negated):
+        return postorder((node, negated), expand, combine, cache)
+
+    return visit(sentence, False)
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    # Evaluate smaller equivalent sentences
+    knowledge, query = simplify(knowledge), simplify(query)
 
-        # If model has an assignment for each symbol
-        if not symbols:
+    # Get all symbols in both knowledge and query, least frequent first
+    symbols = branching_order(knowledge, query)
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+    # Check that knowledge entails query
+    return _check_all(knowledge, query, symbols, dict())
+
+
+def _check_all(knowledge, query, symbols, model, stop=None):
+    """
+    Checks if knowledge base entails query, given a particular model.
+    If `stop` is an event that becomes set, raises `Cancelled`.
+
+    Symbols are assigned from the end of `symbols`, True before False. The
+    search keeps its own stack of assigned symbols rather than recursing, so
+    its depth is not bounded by Python's recursion limit.
+    """
+    assigned = []
+    while True:
+        remaining = len(symbols) - len(assigned)
+
+        # If knowledge base is already false, no extension can be a
+        # counter-model; if query is already true, it holds in every
+        # extension where the knowledge base is true
+        kb_value = knowledge.partial_evaluate(model)
+        query_value = None if kb_value is False else (
+            query.partial_evaluate(model)
+        )
+        if kb_value is True and query_value is False:
+            for p in assigned:
+                del model[p]
+            return False
+        decided = (kb_value is False or query_value is True
+                   or not remaining)
+
+        if not decided:
+
+            # Polling the event is slow, so only do so above small subtrees
+            if (stop is not None and remaining >= CANCEL_CHECK_SYMBOLS
+                    and stop.is_set()):
+                for p in assigned:
+                    del model[p]
+                raise Cancelled()
+
+            # Branch on the most frequently occurring remaining symbol
+            p = symbols[remaining - 1]
+            model[p] = True
+            assigned.append(p)
+            continue
+
+        # Entailment holds here, so move on to the next untried branch
+        while assigned and model[assigned[-1]] is False:
+            del model[assigned.pop()]
+        if not assigned:
             return True
-        else:
+        model[assigned[-1]] = False
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+class Cancelled(Exception):
+    """Raised inside a model checking worker once another has finished."""
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+# Workers only poll for cancellation at nodes with at least this many
+# unassigned symbols below them
+CANCEL_CHECK_SYMBOLS = 12
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+# State shared by every task in a model checking worker process
+_worker = dict()
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+
+def serialize(*sentences):
+    """
+    Returns a compact, picklable encoding of `sentences`.
+
+    The encoding is a tuple of nodes in which children precede their
+    parents. Each node is a tuple of its tag followed by its symbol name or
+    the indices of its children, so shared subsentences are encoded once.
+    The last len(`sentences`) nodes are the roots.
+    """
+    index = dict()
+    nodes = []
+
+    def encode(sentence, parts):
+        if isinstance(sentence, Symbol):
+            nodes.append((Symbol._tag, sentence.name))
+        else:
+            nodes.append((sentence._tag,) + tuple(parts))
+        return len(nodes) - 1
+
+    roots = [
+        postorder(sentence, children, encode, index)
+        for sentence in sentences
+    ]
+    return tuple(nodes) + tuple(nodes[root] for root in roots)
+
+
+def deserialize(data, count=1):
+    """
+    Returns a list of the last `count` sentences encoded in `data`, an
+    encoding produced by `serialize`.
+    """
+    classes = {
+        cls._tag: cls
+        for cls in (Symbol, Not, And, Or, Implication, Biconditional)
+    }
+    sentences = []
+    for tag, *fields in data:
+        if tag == Symbol._tag:
+            sentences.append(Symbol(fields[0]))
+        else:
+            sentences.append(classes[tag](
+                *[sentences[index] for index in fields]
+            ))
+    return sentences[-count:]
+
+
+def _init_worker(data, symbols, stop):
+    """Decodes the problem once per model checking worker process."""
+    _worker["knowledge"], _worker["query"] = deserialize(data, count=2)
+    _worker["symbols"] = symbols
+    _worker["stop"] = stop
+
+
+def _check_subproblem(fixed):
+    """
+    Checks entailment in the worker's problem with the symbols in `fixed`
+    assigned. Returns None if cancelled.
+    """
+    if _worker["stop"].is_set():
+        return None
+    try:
+        return _check_all(
+            _worker["knowledge"], _worker["query"], _worker["symbols"],
+            dict(fixed), _worker["stop"]
+        )
+    except Cancelled:
+        return None
+
+
+def parallel_model_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query, using a pool of `processes`
+    worker processes.
+
+    The assignment space is split by fixing the `split` most frequently
+    occurring symbols, and each assignment of those symbols is checked by a
+    separate task. As soon as any task finds a counter-model, the remaining
+    tasks are cancelled.
+    """
+    processes = processes or os.cpu_count() or 1
+    knowledge, query = simplify(knowledge), simplify(query)
+    symbols = branching_order(knowledge, query)
+    if split is None:
+        split = math.ceil(math.log2(processes * 4))
+    split = min(split, len(symbols))
+    if split == 0:
+        return model_check(knowledge, query)
+    fixed, remaining = symbols[-split:], symbols[:-split]
+
+    stop = multiprocessing.Event()
+    data = serialize(knowledge, query)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(data, remaining, stop)
+    ) as executor:
+        futures = [
+            executor.submit(_check_subproblem, tuple(zip(fixed, values)))
+            for values in itertools.product((True, False), repeat=split)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            if future.result() is False:
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+                return False
+    return True
+
+
+def _satisfying_models(knowledge, symbols, model):
+    """
+    Yields every extension of `model` over `symbols` in which `knowledge`
+    is true. Extensions under which `knowledge` is already decided are
+    expanded over the remaining symbols without further evaluation.
+    Like `_check_all`, assigns symbols from the end of `symbols` and keeps
+    its own stack instead of recursing.
+    """
+    assigned = []
+    while True:
+        remaining = len(symbols) - len(assigned)
+        value = knowledge.partial_evaluate(model)
+        if value is None and remaining:
+            p = symbols[remaining - 1]
+            model[p] = True
+            assigned.append(p)
+            continue
+
+        if value is not False:
+            free = symbols[:remaining]
+            for values in itertools.product((True, False), repeat=remaining):
+                extension = model.copy()
+                extension.update(zip(free, values))
+                yield extension
+
+        while assigned and model[assigned[-1]] is False:
+            del model[assigned.pop()]
+        if not assigned:
+            return
+        model[assigned[-1]] = False
+
+
+def condition(sentence, model):
+    """
+    Returns `sentence` with every symbol assigned in `model` replaced by its
+    value and simplified away. The result is True or False if `model`
+    decides the sentence, and otherwise a sentence over the unassigned
+    symbols. Nested conjunctions and disjunctions are flattened.
+    """
+
+    def negate(value):
+        return (not value) if isinstance(value, bool) else Not(value)
+
+    def junction(cls, parts, absorbing):
+        operands = []
+        for part in parts:
+            if isinstance(part, bool):
+                if part == absorbing:
+                    return absorbing
+                continue
+            if isinstance(part, cls):
+                operands.extend(children(part))
+            else:
+                operands.append(part)
+        if not operands:
+            return not absorbing
+        if len(operands) == 1:
+            return operands[0]
+        return cls(*operands)
+
+    def substitute(node, parts):
+        if isinstance(node, Symbol):
+            value = model.get(node.name)
+            result = node if value is None else bool(value)
+        elif isinstance(node, Not):
+            result = negate(parts[0])
+        elif isinstance(node, And):
+            result = junction(And, parts, False)
+        elif isinstance(node, Or):
+            result = junction(Or, parts, True)
+        elif isinstance(node, Implication):
+            antecedent, consequent = parts
+            if antecedent is False or consequent is True:
+                result = True
+            elif antecedent is True:
+                result = consequent
+            elif consequent is False:
+                result = negate(antecedent)
+            else:
+                result = Implication(antecedent, consequent)
+        elif isinstance(node, Biconditional):
+            left, right = parts
+            if isinstance(left, bool) and isinstance(right, bool):
+                result = left == right
+            elif isinstance(left, bool):
+                result = right if left else negate(right)
+            elif isinstance(right, bool):
+                result = left if right else negate(left)
+            else:
+                result = Biconditional(left, right)
+        else:
+            raise TypeError("must be a logical sentence")
+        return result
+
+    return postorder(sentence, children, substitute)
+
+
+def components(conjuncts):
+    """
+    Partitions `conjuncts` into lists of sentences such that no two lists
+    share a symbol.
+    """
+    parent = dict()
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for conjunct in conjuncts:
+        names = list(conjunct.symbols())
+        for name in names:
+            parent.setdefault(name, name)
+        for name in names[1:]:
+            parent[find(name)] = find(names[0])
+
+    groups = dict()
+    for conjunct in conjuncts:
+        names = conjunct.symbols()
+        root = find(next(iter(names))) if names else None
+        groups.setdefault(root, []).append(conjunct)
+    return list(groups.values())
+
+
+def count_models(sentence, symbols=None):
+    """
+    Returns the number of models of `sentence` over `symbols`, which
+    defaults to the symbols of `sentence`.
+
+    Counts by branching on the most frequent symbol, splitting conjunctions
+    into independent components whose counts multiply, and caching the
+    count of every residual sentence.
+    """
+    # Whether each sentence splits into components, and its subproblems
+    subproblems = dict()
+
+    def expand(node):
+        """Returns the sentences whose counts give the count of `node`."""
+        if isinstance(node, bool) or not node.symbols():
+            return ()
+        if node not in subproblems:
+            parts = components(node.conjuncts) if isinstance(node, And) else []
+            if len(parts) > 1:
+                subproblems[node] = (True, [
+                    And(*part) if len(part) > 1 else part[0]
+                    for part in parts
+                ])
+            else:
+                p = symbol_occurrences(node).most_common(1)[0][0]
+                subproblems[node] = (False, [
+                    condition(node, {p: value}) for value in (True, False)
+                ])
+        return subproblems[node][1]
+
+    def count(node, counts):
+        """Returns the number of models of `node` over its own symbols."""
+        if isinstance(node, bool):
+            return int(node)
+        if not node.symbols():
+            return int(node.evaluate(dict()))
+        split, parts = subproblems[node]
+        if split:
+            return math.prod(counts)
+        total = len(node.symbols())
+        result = 0
+        for residual, residual_count in zip(parts, counts):
+            free = 0 if isinstance(residual, bool) else len(
+                residual.symbols()
+            )
+            result += residual_count << (total - 1 - free)
+        return result
+
+    if symbols is None:
+        symbols = sentence.symbols()
+    missing = len(frozenset(symbols) - sentence.symbols())
+    return postorder(sentence, expand, count) << missing
+
+
+def iter_models(sentence, symbols=None):
+    """
+    Yields every model of `sentence` over `symbols`, which defaults to the
+    symbols of `sentence`, as a dict mapping symbol names to truth values.
+    Models are generated lazily, one at a time.
+    """
+    order = branching_order(sentence)
+    if symbols is not None:
+        order = [
+            symbol for symbol in symbols if symbol not in sentence.symbols()
+        ] + order
+    yield from _satisfying_models(sentence, order, dict())
+
+
+class KnowledgeBase():
+    """
+    A knowledge base that answers many entailment queries from one
+    compiled form of its sentences.
+
+    The knowledge base is compiled into a binary decision diagram on the
+    first query and reused until a sentence is added; each entailment check
+    is then polynomial in the size of the diagram. If the diagram needs
+    more than `node_limit` live nodes, queries fall back to `model_check`.
+    Nodes built to answer a query are discarded afterwards, so queries never
+    use up the diagram's node limit.
+    """
+
+    def __init__(self, *sentences, node_limit=None, order="appearance"):
+        self.knowledge = And(*sentences)
+        self.node_limit = node_limit
+        self.order = order
+        self._compiled = None
+
+    def add(self, sentence):
+        """Adds `sentence` to the knowledge base."""
+        self.knowledge = And(*self.knowledge.conjuncts, sentence)
+        self._compiled = None
+
+    def symbols(self):
+        """Returns a frozenset of all symbols in the knowledge base."""
+        return self.knowledge.symbols()
+
+    def compiled(self):
+        """
+        Returns a (bdd, node) pair for the knowledge base, or None if it
+        exceeds the node limit. The node is only valid until the diagram is
+        next used, since collecting garbage renumbers nodes.
+        """
+        from bdd import NODE_LIMIT, NodeLimitExceeded, compile_sentence
+
+        # Keep the compiled sentence, whose node `compile` looks up again
+        if self._compiled is None:
+            sentence = simplify(self.knowledge)
+            try:
+                bdd, _ = compile_sentence(
+                    sentence, order=self.order,
+                    node_limit=self.node_limit or NODE_LIMIT
+                )
+                self._compiled = (bdd, sentence)
+            except NodeLimitExceeded:
+                self._compiled = False
+        if not self._compiled:
+            return None
+        bdd, sentence = self._compiled
+        return bdd, bdd.compile(sentence)
+
+    def models(self):
+        """Yields every model of the knowledge base as a dict."""
+        compiled = self.compiled()
+        if compiled is None:
+            yield from iter_models(simplify(self.knowledge), self.symbols())
+            return
+        bdd, root = compiled
+
+        # Symbols that simplified away are free in every model
+        free = sorted(self.symbols() - set(bdd.order))
+        for model in bdd.satisfying_models(root):
+            for values in itertools.product((True, False), repeat=len(free)):
+                model.update(zip(free, values))
+                yield dict(model)
+
+    def count(self):
+        """Returns the number of models of the knowledge base."""
+        compiled = self.compiled()
+        if compiled is None:
+            return count_models(simplify(self.knowledge), self.symbols())
+        bdd, root = compiled
+        return bdd.count(root, self.symbols())
+
+    def condition(self, evidence):
+        """
+        Returns a new knowledge base that also asserts `evidence`, a dict
+        mapping symbol names to truth values. If the knowledge base is
+        compiled, the new one starts from a copy of its diagram instead of
+        recompiling, unless that would exceed the node limit.
+        """
+        from bdd import NodeLimitExceeded
+
+        literals = [
+            Symbol(name) if value else Not(Symbol(name))
+            for name, value in evidence.items()
+        ]
+        conditioned = KnowledgeBase(
+            self.knowledge, *literals,
+            node_limit=self.node_limit, order=self.order
+        )
+        if self.compiled() is not None:
+            bdd, sentence = self._compiled
+            bdd = bdd.copy()
+            sentence = And(sentence, *literals)
+            try:
+                bdd.compile(sentence)
+                conditioned._compiled = (bdd, sentence)
+            except NodeLimitExceeded:
+                pass
+        return conditioned
+
+    def entails(self, query):
+        """Checks if the knowledge base entails `query`."""
+        from bdd import NodeLimitExceeded
+
+        if self.compiled() is None:
+            return model_check(self.knowledge, query)
+        bdd, sentence = self._compiled
+        mark = bdd.mark()
+        try:
+            node = bdd.compile(query)
+            return bdd.entails(bdd.compile(sentence), node)
+        except NodeLimitExceeded:
+            return model_check(self.knowledge, query)
+        finally:
+            bdd.rollback(mark)
+
+
+def entailed_symbols(knowledge, queries):
+    """
+    Returns a list of the sentences in `queries` that `knowledge` entails,
+    compiling `knowledge` only once.
+    """
+    knowledge_base = KnowledgeBase(knowledge)
+    return [query for query in queries if knowledge_base.entails(query)]
@@ -0,0 +1,210 @@
+import itertools
+import random
+
+from logic import *
+
+SYMBOLS = [Symbol(name) for name in "ABCDE"]
+
+
+def random_sentence(depth):
+    """Returns a random sentence over SYMBOLS at most `depth` levels deep."""
+    if depth == 0 or random.random() < 0.2:
+        return random.choice(SYMBOLS)
+    kind = random.choice([Not, And, Or, Implication, Biconditional])
+    if kind is Not:
+        return Not(random_sentence(depth - 1))
+    if kind in (And, Or):
+        return kind(*[
+            random_sentence(depth - 1) for _ in range(random.randint(1, 3))
+        ])
+    return kind(random_sentence(depth - 1), random_sentence(depth - 1))
+
+
+def truth_table(sentence, symbols):
+    """Returns every model of `sentence` over `symbols`, by enumeration."""
+    names = sorted(symbols)
+    models = []
+    for values in itertools.product((True, False), repeat=len(names)):
+        model = dict(zip(names, values))
+        if sentence.evaluate(model):
+            models.append(model)
+    return models
+
+
+def as_set(models):
+    return {frozenset(model.items()) for model in models}
+
+
+def test_counting():
+    names = {symbol.name for symbol in SYMBOLS}
+    for seed in range(300):
+        random.seed(seed)
+        sentence = random_sentence(4)
+        table = truth_table(sentence, sentence.symbols())
+        assert count_models(sentence) == len(table), seed
+        assert as_set(iter_models(sentence)) == as_set(table), seed
+
+        # Over extra symbols, every model extends to each of their values
+        table = truth_table(sentence, names)
+        assert count_models(sentence, names) == len(table), seed
+        assert as_set(iter_models(sentence, names)) == as_set(table), seed
+
+
+def test_simplify():
+    for seed in range(300):
+        random.seed(seed)
+        sentence = random_sentence(5)
+        simplified = simplify(sentence)
+        assert as_set(truth_table(simplified, sentence.symbols())) == as_set(
+            truth_table(sentence, sentence.symbols())
+        ), seed
+
+        # Negations sit on symbols, implications are gone, and no
+        # conjunction or disjunction directly holds one of its own kind
+        stack = [simplified]
+        while stack:
+            node = stack.pop()
+            assert not isinstance(node, Implication), seed
+            if isinstance(node, Not):
+                assert isinstance(node.operand, Symbol), seed
+            for child in children(node):
+                assert type(child) is not type(node) or isinstance(
+                    node, (Not, Biconditional)
+                ), seed
+                stack.append(child)
+
+
+def test_deep():
+    # Thousands of levels of nesting over a few symbols
+    A, B, C, D = SYMBOLS[:4]
+    cycle = [A, B, C, D]
+    sentence = A
+    for i in range(3200):
+        sentence = And(sentence, Implication(cycle[i % 4], cycle[(i + 1) % 4]))
+    assert sentence.evaluate({"A": True, "B": True, "C": True, "D": True})
+    assert not sentence.evaluate({"A": True, "B": True, "C": False, "D": True})
+    assert sentence.symbols() == {"A", "B", "C", "D"}
+    assert sentence.formula().count("=>") == 3200
+    assert model_check(sentence, D) and not model_check(sentence, Not(C))
+    assert entailed_symbols(sentence, [A, B, Not(C), D]) == [A, B, D]
+
+    # A chain through thousands of symbols, one level each
+    symbols = [Symbol(f"P{i}") for i in range(3200)]
+    sentence = symbols[0]
+    for i in range(len(symbols) - 1):
+        sentence = And(sentence, Implication(symbols[i], symbols[i + 1]))
+    queries = [symbols[0], symbols[-1], Not(symbols[5]), Or(*symbols[1:])]
+    assert entailed_symbols(sentence, queries) == [
+        symbols[0], symbols[-1], Or(*symbols[1:])
+    ]
+
+
+def test_serialize():
+    for seed in range(100):
+        random.seed(seed)
+        sentences = [random_sentence(4) for _ in range(3)]
+        assert deserialize(serialize(*sentences), 3) == sentences, seed
+
+
+def test_parallel_model_check():
+    A, B, C, D, E = SYMBOLS
+    knowledge = And(
+        Or(A, B), Implication(A, C), Implication(B, C),
+        Biconditional(D, Not(E))
+    )
+    for query in (C, Or(D, E), A, Not(D)):
+        expected = model_check(knowledge, query)
+        for split in (1, 3):
+            assert parallel_model_check(
+                knowledge, query, processes=2, split=split
+            ) == expected, (query, split)
+
+
+def test_knowledge_base():
+    for seed in range(300):
+        random.seed(seed)
+        sentence = random_sentence(4)
+        for node_limit in (None, 8):
+            knowledge = KnowledgeBase(sentence, node_limit=node_limit)
+            table = truth_table(sentence, knowledge.symbols())
+            assert knowledge.count() == len(table), seed
+            assert as_set(knowledge.models()) == as_set(table), seed
+            for _ in range(3):
+                query = random_sentence(2)
+                assert knowledge.entails(query) == model_check(
+                    sentence, query
+                ), (seed, query)
+
+            name = random.choice(SYMBOLS).name
+            value = random.random() < 0.5
+            conditioned = knowledge.condition({name: value})
+            table = [
+                model for model in truth_table(
+                    sentence, knowledge.symbols() | {name}
+                )
+                if model[name] == value
+            ]
+            assert conditioned.count() == len(table), seed
+            assert as_set(conditioned.models()) == as_set(table), seed
+
+
+def test_immutable():
+    A, B = SYMBOLS[:2]
+    knowledge = And(A)
+    try:
+        knowledge.add(B)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("And.add should raise")
+    assert knowledge.conjuncts == (A,)
+
+    base = KnowledgeBase(A)
+    base.add(B)
+    assert base.knowledge is And(A, B)
+
+
+def test_node_limit():
+    A, B, C, D = SYMBOLS[:4]
+    knowledge = KnowledgeBase(Or(And(A, B), And(C, D)), node_limit=10)
+    bdd, root = knowledge.compiled()
+    size = len(bdd)
+
+    # Conditioning past the limit leaves the new knowledge base uncompiled
+    conditioned = knowledge.condition({"E": True, "B": False})
+    assert conditioned.entails(And(C, D))
+    assert conditioned.count() == 2
+
+    # Queries do not use up the shared diagram
+    for k in range(100):
+        assert not knowledge.entails(Or(Symbol(f"Q{k}"), A))
+    assert len(bdd) == size
+
+
+def test_chain():
+    symbols = [Symbol(f"P{i}") for i in range(400)]
+    knowledge = And(symbols[0], *[
+        Implication(symbols[i], symbols[i + 1])
+        for i in range(len(symbols) - 1)
+    ])
+
+    # Compiling allocates far more nodes than the diagram keeps
+    knowledge_base = KnowledgeBase(knowledge, node_limit=5000)
+    bdd, root = knowledge_base.compiled()
+    assert len(bdd) < 5000 and bdd.count(root) == 1
+    assert entailed_symbols(knowledge, symbols) == symbols
+    assert not knowledge_base.entails(Not(symbols[-1]))
+    assert knowledge_base.condition({"P9": False}).count() == 0
+
+
+if __name__ == "__main__":
+    test_counting()
+    test_simplify()
+    test_deep()
+    test_serialize()
+    test_parallel_model_check()
+    test_knowledge_base()
+    test_immutable()
+    test_node_limit()
+    test_chain()
+    print("All tests passed.")
@@ -1,6 +1,15 @@
+import collections
 import itertools
+import math
 import random
 
+from fractions import Fraction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class Minesweeper():
     """
@@ -12,23 +21,35 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
+        # Add mines randomly, sampling distinct cells without rejection
+        self.mines = set(
+            divmod(index, width)
+            for index in random.sample(range(height * width), mines)
+        )
+
+        # Mine grid, and count of neighboring mines for every cell,
+        # computed once up front
+        if numpy is not None:
+            self.board = numpy.zeros((height, width), dtype=bool)
+            for i, j in self.mines:
+                self.board[i, j] = True
+            padded = numpy.pad(self.board.astype(numpy.uint8), 1)
+            self.counts = sum(
+                padded[1 + di:1 + di + height, 1 + dj:1 + dj + width]
+                for di in (-1, 0, 1)
+                for dj in (-1, 0, 1)
+                if (di, dj) != (0, 0)
+            )
+        else:
+            self.board = [[False] * width for _ in range(height)]
+            self.counts = [[0] * width for _ in range(height)]
+            for i, j in self.mines:
                 self.board[i][j] = True
+                for k in range(max(i - 1, 0), min(i + 2, height)):
+                    for l in range(max(j - 1, 0), min(j + 2, width)):
+                        if (k, l) != (i, j):
+                            self.counts[k][l] += 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -50,7 +71,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i][j])
 
     def nearby_mines(self, cell):
         """
@@ -59,23 +80,34 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+        i, j = cell
+        return int(self.counts[i][j])
 
-        return count
+    def reveal(self, cell, revealed=frozenset()):
+        """
+        Reveals a cell that is not a mine, and returns a list of
+        (cell, nearby mines) pairs for it and every cell revealed with it.
+        Revealing a cell with no nearby mines also reveals all of its
+        neighbors, flooding outward through connected zero cells. Cells in
+        `revealed` are skipped.
+        """
+        result = []
+        seen = {cell}
+        queue = [cell]
+        while queue:
+            i, j = queue.pop()
+            if (i, j) in revealed:
+                continue
+            count = self.nearby_mines((i, j))
+            result.append(((i, j), count))
+            if count:
+                continue
+            for k in range(max(i - 1, 0), min(i + 2, self.height)):
+                for l in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (k, l) not in seen:
+                        seen.add((k, l))
+                        queue.append((k, l))
+        return result
 
     def won(self):
         """
@@ -89,26 +121,136 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    Cells are stored as bits of an integer mask, so subset tests,
+    differences and cell counts are single integer operations. Cell (i, j)
+    is numbered i * width + j, and the mask is shifted down so that its
+    lowest bit is the sentence's first cell, numbered `base`. A sentence's
+    mask therefore spans at most a few rows of the board, however large
+    the board is. Sentences are immutable, since they are kept in sets and
+    hashed once; marking a cell returns a new sentence.
     """
 
-    def __init__(self, cells, count):
-        if cells is not None:
-            self.cells = set(cells)
+    __slots__ = ("mask", "base", "count", "width", "_hash")
+
+    def __init__(self, cells, count, width=None):
+        cells = set(cells)
+        if width is None:
+            width = max((j for _, j in cells), default=0) + 1
+        numbers = [i * width + j for i, j in cells]
+        base = min(numbers, default=0)
+        mask = 0
+        for number in numbers:
+            mask |= 1 << (number - base)
+        self._set(mask, count, width, base)
+
+    def _set(self, mask, count, width, base=0):
+        """
+        Sets the sentence's fields from `mask`, whose bit 0 is cell
+        number `base`, rebasing it onto its lowest set bit.
+        """
+        if mask:
+            shift = (mask & -mask).bit_length() - 1
+            mask >>= shift
+            base += shift
         else:
-            self.cells = set()
-        self.count = count
+            base = 0
+        object.__setattr__(self, "mask", mask)
+        object.__setattr__(self, "base", base)
+        object.__setattr__(self, "count", count)
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "_hash", hash((mask, base, count, width)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __reduce__(self):
+        return (Sentence.from_mask,
+                (self.mask, self.count, self.width, self.base))
+
+    @classmethod
+    def from_mask(cls, mask, count, width, base=0):
+        """
+        Returns a sentence whose cells are the bits set in `mask`, where
+        bit 0 is cell number `base`.
+        """
+        sentence = cls.__new__(cls)
+        sentence._set(mask, count, width, base)
+        return sentence
+
+    @property
+    def cells(self):
+        cells = set()
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            cells.add(divmod(self.base + low.bit_length() - 1, self.width))
+            mask ^= low
+        return cells
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return (
+            self.mask == other.mask and self.base == other.base
+            and self.count == other.count and self.width == other.width
+        )
+
+    def __hash__(self):
+        return self._hash
+
+    def __len__(self):
+        return self.mask.bit_count()
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def __contains__(self, cell):
+        i, j = cell
+        if not 0 <= j < self.width:
+            return False
+        bit = i * self.width + j - self.base
+        return bit >= 0 and self.mask >> bit & 1 == 1
+
+    def aligned(self, other):
+        """
+        Returns the masks of this sentence and `other` shifted onto a
+        common base, along with that base. Sentences with different widths
+        are first renumbered to the wider of the two.
+        """
+        if other.width != self.width:
+            width = max(self.width, other.width)
+            return Sentence(self.cells, self.count, width).aligned(
+                Sentence(other.cells, other.count, width)
+            )
+        base = min(self.base, other.base)
+        return (
+            self.mask << (self.base - base),
+            other.mask << (other.base - base),
+            base
+        )
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is also in `other`.
+        """
+        mask, other_mask, _ = self.aligned(other)
+        return mask & ~other_mask == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence whose cells are this sentence's cells not in
+        `other`, and whose count is this sentence's count less `other`'s.
+        """
+        mask, other_mask, base = self.aligned(other)
+        return Sentence.from_mask(
+            mask & ~other_mask, self.count - other.count,
+            max(self.width, other.width), base
+        )
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if len(self.cells) == self.count:
+        if self.mask.bit_count() == self.count:
             return self.cells
         return set()
 
@@ -120,22 +262,135 @@ class Sentence():
             return self.cells
         return set()
 
+    def without(self, cell, mine):
+        """
+        Returns this sentence with `cell` removed, counting it as a mine
+        if `mine` is True.
+        """
+        if cell not in self:
+            return self
+        i, j = cell
+        bit = i * self.width + j - self.base
+        return Sentence.from_mask(
+            self.mask & ~(1 << bit), self.count - mine, self.width, self.base
+        )
+
     def mark_mine(self, cell):
         """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
+        Returns the sentence updated given the fact that a cell is known
+        to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -= 1
+        return self.without(cell, True)
 
     def mark_safe(self, cell):
         """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
+        Returns the sentence updated given the fact that a cell is known
+        to be safe.
+        """
+        return self.without(cell, False)
+
+
+class LinearConstraints():
+    """
+    Frontier constraints as a sparse 0/1 matrix and count vector, kept in
+    reduced row echelon form by incremental Gaussian elimination.
+
+    Each row is stored under its pivot cell as (coefficients, count),
+    meaning pivot + sum(coefficient * cell) == count over the other cells.
+    Pivot cells appear in no other row.
+    """
+
+    def __init__(self):
+
+        # Map from each pivot cell to its row
+        self.rows = dict()
+
+        # Map from each non-pivot cell to the pivots of rows containing it
+        self.columns = dict()
+
+        # Pivots of rows changed since deductions were last made
+        self.dirty = set()
+
+    def add_row(self, coefficients, count):
+        """
+        Adds the constraint sum(coefficient * cell) == count, where
+        `coefficients` maps cells to coefficients, reducing it against
+        the existing rows and eliminating its pivot from them.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        row = {cell: Fraction(a) for cell, a in coefficients.items() if a}
+        count = Fraction(count)
+        for pivot in [cell for cell in row if cell in self.rows]:
+            factor = row.pop(pivot)
+            pivot_row, pivot_count = self.rows[pivot]
+            for cell, a in pivot_row.items():
+                row[cell] = row.get(cell, 0) - factor * a
+                if not row[cell]:
+                    del row[cell]
+            count -= factor * pivot_count
+        if not row:
+            return
+
+        # Normalize on a new pivot, then remove it from every other row
+        pivot = min(row)
+        scale = row.pop(pivot)
+        row = {cell: a / scale for cell, a in row.items()}
+        count /= scale
+        for other in self.columns.pop(pivot, set()):
+            other_row, other_count = self.rows[other]
+            factor = other_row.pop(pivot)
+            for cell, a in row.items():
+                other_row[cell] = other_row.get(cell, 0) - factor * a
+                if other_row[cell]:
+                    self.columns.setdefault(cell, set()).add(other)
+                else:
+                    del other_row[cell]
+                    self.columns[cell].discard(other)
+            self.rows[other] = (other_row, other_count - factor * count)
+            self.dirty.add(other)
+
+        self.rows[pivot] = (row, count)
+        for cell in row:
+            self.columns.setdefault(cell, set()).add(pivot)
+        self.dirty.add(pivot)
+
+    def assign(self, cell, value):
+        """
+        Substitutes a known value (1 for a mine, 0 for safe) for a cell.
+        """
+        if cell in self.rows:
+            row, count = self.rows.pop(cell)
+            self.dirty.discard(cell)
+            for other in row:
+                self.columns[other].discard(cell)
+            self.add_row(row, count - value)
+            return
+        for pivot in self.columns.pop(cell, set()):
+            row, count = self.rows[pivot]
+            self.rows[pivot] = (row, count - row.pop(cell) * value)
+            self.dirty.add(pivot)
+
+    def deductions(self):
+        """
+        Returns (mines, safes), the sets of cells whose values follow from
+        a changed row alone: a row whose count equals the smallest or
+        largest value its cells could sum to fixes every one of them.
+        """
+        mines = set()
+        safes = set()
+        while self.dirty:
+            pivot = self.dirty.pop()
+            row, count = self.rows[pivot]
+            terms = dict(row)
+            terms[pivot] = 1
+            low = sum(a for a in terms.values() if a < 0)
+            high = sum(a for a in terms.values() if a > 0)
+            if count == high:
+                mines.update(cell for cell, a in terms.items() if a > 0)
+                safes.update(cell for cell, a in terms.items() if a < 0)
+            elif count == low:
+                safes.update(cell for cell, a in terms.items() if a > 0)
+                mines.update(cell for cell, a in terms.items() if a < 0)
+        return mines, safes
 
 
 class MinesweeperAI():
@@ -143,11 +398,23 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Components with more cells than this are sampled, not enumerated
+    COMPONENT_CELL_LIMIT = 40
+
+    # Number of assignments sampled for a component over the limit
+    COMPONENT_SAMPLES = 200
+
+    # With more components than this, each component is weighted by the
+    # density of the remaining mines instead of by every way of placing
+    # them in the other components
+    COMPONENT_EXACT_LIMIT = 64
+
+    def __init__(self, height=8, width=8, mines=None, solver="subset"):
 
-        # Set initial height and width
+        # Set initial height, width, and total number of mines, if known
         self.height = height
         self.width = width
+        self.total_mines = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -156,8 +423,68 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells not yet chosen, and cells neither chosen nor known to
+        # be safe or mines, kept as a list with each cell's position so
+        # that cells can be removed and chosen at random in constant time
+        self.safe_moves = set()
+        self.unknown = [(i, j) for i in range(height) for j in range(width)]
+        self.unknown_index = {cell: i for i, cell in enumerate(self.unknown)}
+
+        # Set of sentences about the game known to be true
+        self.knowledge = set()
+
+        # Mine-count distribution of each component found the last time
+        # probabilities were computed, keyed by the component's sentences
+        self.component_cache = dict()
+
+        # Map from each cell to the sentences in self.knowledge that
+        # contain it
+        self.cell_index = dict()
+
+        # Sentences changed since they were last checked for known cells,
+        # and since they were last compared with sentences sharing a cell
+        self.changed = []
+        self.pending = []
+
+        # Inference backend: "subset" combines pairs of sentences, while
+        # "linear" also runs Gaussian elimination over all sentences
+        if solver not in ("subset", "linear"):
+            raise ValueError(f"unknown solver {solver!r}")
+        self.solver = solver
+        self.linear = LinearConstraints() if solver == "linear" else None
+
+    def remove_unknown(self, cell):
+        """
+        Removes a cell from the list of unknown cells, if present.
+        """
+        index = self.unknown_index.pop(cell, None)
+        if index is None:
+            return
+        last = self.unknown.pop()
+        if last != cell:
+            self.unknown[index] = last
+            self.unknown_index[last] = index
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and indexes it by its cells,
+        unless it is empty or an equal sentence is already known.
+        """
+        if not sentence or sentence in self.knowledge:
+            return
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.cell_index.setdefault(cell, set()).add(sentence)
+        self.changed.append(sentence)
+        self.pending.append(sentence)
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base and from the index.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            self.cell_index.get(cell, set()).discard(sentence)
 
     def mark_mine(self, cell):
         """
@@ -165,8 +492,12 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.remove_unknown(cell)
+        if self.linear is not None:
+            self.linear.assign(cell, 1)
+        for sentence in self.cell_index.pop(cell, set()):
+            self.remove_sentence(sentence)
+            self.add_sentence(sentence.mark_mine(cell))
 
     def mark_safe(self, cell):
         """
@@ -174,8 +505,14 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.remove_unknown(cell)
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        if self.linear is not None:
+            self.linear.assign(cell, 0)
+        for sentence in self.cell_index.pop(cell, set()):
+            self.remove_sentence(sentence)
+            self.add_sentence(sentence.mark_safe(cell))
 
     def add_new_sentence(self, cell, count):
         sentence_cells = set() 
@@ -191,41 +528,75 @@ class MinesweeperAI():
                 if 0 <= i < self.height and 0 <= j < self.width:
                     sentence_cells.add((i,j))
 
-        self.knowledge.append(Sentence(sentence_cells, count))
+        self.add_sentence(Sentence(sentence_cells, count, self.width))
+        if self.linear is not None:
+            self.linear.add_row(dict.fromkeys(sentence_cells, 1), count)
     
     def update_knowledge(self):
+        """
+        Marks the cells of every changed sentence that are now known to be
+        mines or safe. Marking a cell only revisits the sentences that
+        contain it, via self.cell_index.
+        """
+        while self.changed:
+            sentence = self.changed.pop()
+            if sentence not in self.knowledge:
+                continue
+
+            for mine in sentence.known_mines().copy():
+                self.mark_mine(mine)
+
+            for safe in sentence.known_safes().copy():
+                self.mark_safe(safe)
 
-        new_knowledge = True
-        while new_knowledge:
-            new_knowledge = False
-
-            for sentence in self.knowledge:
-                if sentence.known_mines():
-                    new_knowledge = True
-                    for mine in sentence.cells.copy():
-                        self.mark_mine(mine)
-            
-                if sentence.known_safes():
-                    new_knowledge = True
-                    for safe in sentence.cells.copy():
-                        self.mark_safe(safe) 
-
-        empty_sentence = Sentence(None, 0)
-        self.knowledge = [sentence for sentence in self.knowledge if sentence != empty_sentence]
-    
     def find_new_knowledge(self):
-        for sub_sent in self.knowledge:
-            for sent in self.knowledge:
-                if sub_sent is sent: continue
+        """
+        Compares each pending sentence with the sentences it shares a cell
+        with. Whenever one sentence's cells are a subset of another's, adds
+        the sentence formed by the difference of their cells and counts.
+        """
+        while self.pending:
+            sentence = self.pending.pop()
+            if sentence not in self.knowledge:
+                continue
+
+            neighbors = set()
+            for cell in sentence.cells:
+                neighbors.update(self.cell_index.get(cell, set()))
 
-                if sub_sent == sent:
-                    self.knowledge.remove(sent)
+            for other in neighbors:
+                subset = sentence.issubset(other)
+                superset = other.issubset(sentence)
+                if subset == superset:
                     continue
-                
-                if sub_sent.cells.issubset(sent.cells):
-                    new_cells = sent.cells - sub_sent.cells
-                    new_count = sent.count - sub_sent.count
-                    self.knowledge.append(Sentence(new_cells, new_count))
+                if subset:
+                    self.add_sentence(other.difference(sentence))
+                else:
+                    self.add_sentence(sentence.difference(other))
+
+    def infer(self):
+        """
+        Alternates marking known cells and finding new sentences until
+        neither has anything left to process. The linear solver then
+        deduces cells from its reduced rows, and the process repeats until
+        nothing more can be concluded.
+        """
+        while True:
+            while self.changed or self.pending:
+                self.update_knowledge()
+                self.find_new_knowledge()
+
+            if self.linear is None:
+                return
+            mines, safes = self.linear.deductions()
+            mines -= self.mines
+            safes -= self.safes
+            if not mines and not safes:
+                return
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
 
     def add_knowledge(self, cell, count):
         """
@@ -242,11 +613,22 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
-        self.add_new_sentence(cell, count)
-        self.update_knowledge()
-        self.find_new_knowledge()
+        self.add_knowledge_many([(cell, count)])
+
+    def add_knowledge_many(self, reveals):
+        """
+        Adds knowledge for many revealed cells at once, given a list of
+        (cell, count) pairs such as those returned by Minesweeper.reveal.
+        Every cell is marked safe and every sentence added before a single
+        round of inference runs.
+        """
+        for cell, _ in reveals:
+            self.moves_made.add(cell)
+            self.safe_moves.discard(cell)
+            self.mark_safe(cell)
+        for cell, count in reveals:
+            self.add_new_sentence(cell, count)
+        self.infer()
 
     def make_safe_move(self):
         """
@@ -257,31 +639,394 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        return_move = None
-
-        for move in self.safes:
-            if move not in self.moves_made:
-                return_move = move
-                break 
-
-        if return_move != None:
-            self.safes.remove(return_move)
-
-        return return_move
+        if not self.safe_moves:
+            return None
+        return self.safe_moves.pop()
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        picking randomly among the cells least likely to be a mine.
         """
-        available_moves = []
+        if not self.unknown:
+            return None
+        probabilities, density = self.frontier_probabilities()
+        free = len(self.unknown) - len(probabilities)
 
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                    available_moves.append((i, j))
+        lowest = min(probabilities.values(), default=density)
+        if free:
+            lowest = min(lowest, density)
+        ties = [
+            cell for cell, probability in probabilities.items()
+            if probability <= lowest + 1e-9
+        ]
+        if not free or density > lowest + 1e-9:
+            return random.choice(ties)
+
+        # Choose uniformly among the tied cells and the unconstrained cells,
+        # sampling an unconstrained cell without listing them all
+        if random.randrange(len(ties) + free) < len(ties):
+            return random.choice(ties)
+        for _ in range(32):
+            cell = random.choice(self.unknown)
+            if cell not in probabilities:
+                return cell
+        return random.choice([
+            cell for cell in self.unknown if cell not in probabilities
+        ])
+
+    def mine_probabilities(self):
+        """
+        Returns a dict mapping each cell that has not been chosen and is not
+        known to be a mine to the probability that it is a mine.
+        """
+        probabilities, density = self.frontier_probabilities()
+        for cell in self.unknown:
+            probabilities.setdefault(cell, density)
+        for cell in self.safe_moves:
+            probabilities[cell] = 0.0
+        return probabilities
+
+    def frontier_probabilities(self):
+        """
+        Returns (probabilities, density): a dict mapping each cell in some
+        sentence to the probability that it is a mine, and the probability
+        shared by every unknown cell outside all sentences.
+
+        Cells linked by sentences form independent components, whose
+        consistent assignments are counted by number of mines. If the total
+        number of mines is known, the components are weighted by the number
+        of ways to place the remaining mines in the unconstrained cells.
+        Beyond COMPONENT_EXACT_LIMIT components, that weight is approximated
+        by a density of mines shared by every component, so the time taken
+        grows linearly with the number of components.
+        """
+        components = self.constraint_components()
+        constrained = set().union(*[cells for cells, _ in components])
+        free = len(self.unknown) - len(constrained)
+        solutions = self.component_solutions(components)
+        if not all(solutions):
+            return dict.fromkeys(constrained, 0.5), 0.5
+
+        if self.total_mines is None:
+            # Without a total, the components are independent, and
+            # unconstrained cells are assumed no riskier than the safest
+            # constrained cell
+            probabilities = self.tilted_probabilities(
+                components, solutions, 0.0
+            )
+            return probabilities, min(probabilities.values(), default=0.5)
+
+        remaining = self.total_mines - len(self.mines)
+        if len(components) > self.COMPONENT_EXACT_LIMIT:
+            return self.density_probabilities(
+                components, solutions, remaining, free
+            )
+        return self.exact_probabilities(
+            components, solutions, remaining, free
+        )
+
+    def component_solutions(self, components):
+        """
+        Returns, for each component, its distribution over its number of
+        mines as {mines: [weight, [weight with each cell a mine]]},
+        normalized. Distributions of components whose sentences are
+        unchanged since the last call are reused.
+        """
+        cache = dict()
+        solutions = []
+        for cells, sentences in components:
+            key = frozenset(sentences)
+            solution = self.component_cache.get(key)
+            if solution is None:
+                if len(cells) > self.COMPONENT_CELL_LIMIT:
+                    counts = self.sample_component(cells, sentences)
+                else:
+                    counts = self.count_component(cells, sentences)
+                total = sum(ways for ways, _ in counts.values()) or 1
+                solution = {
+                    k: [ways / total, [w / total for w in cell_ways]]
+                    for k, (ways, cell_ways) in counts.items()
+                }
+            cache[key] = solution
+            solutions.append(solution)
+        self.component_cache = cache
+        return solutions
+
+    def exact_probabilities(self, components, solutions, remaining, free):
+        """
+        Returns (probabilities, density) as `frontier_probabilities` does,
+        weighting every total number of mines in the components by the
+        number of ways to place the rest in the `free` unconstrained cells.
+        """
+        def log_comb(n, r):
+            return (math.lgamma(n + 1) - math.lgamma(r + 1)
+                    - math.lgamma(n - r + 1))
+
+        def convolve(first, second):
+            """Returns the distribution of the sum of two mine counts."""
+            combined = dict()
+            for a, x in first.items():
+                for b, y in second.items():
+                    combined[a + b] = combined.get(a + b, 0.0) + x * y
+            return combined
+
+        # Distributions of the mines in the components before each one
+        prefixes = [{0: 1.0}]
+        for solution in solutions:
+            prefixes.append(convolve(prefixes[-1], {
+                k: ways for k, (ways, _) in solution.items()
+            }))
+        everything = prefixes[-1]
+
+        base = max([
+            log_comb(free, remaining - k)
+            for k in everything
+            if 0 <= remaining - k <= free
+        ], default=0.0)
+
+        def weight(k):
+            if not 0 <= remaining - k <= free:
+                return 0.0
+            return math.exp(log_comb(free, remaining - k) - base)
+
+        # Total weight of placing the mines of the components from each one
+        # on, given the number of mines in the components before it, so
+        # that no component's complement has to be convolved separately
+        after = [None] * len(solutions) + [
+            {k: weight(k) for k in everything}
+        ]
+        for index in reversed(range(len(solutions))):
+            following = after[index + 1]
+            after[index] = {
+                t: sum(
+                    ways * following[t + k]
+                    for k, (ways, _) in solutions[index].items()
+                )
+                for t in prefixes[index]
+            }
+        normalizer = after[0][0]
+        if normalizer <= 0:
+            return dict.fromkeys(
+                [cell for cells, _ in components for cell in cells], 0.5
+            ), 0.5
+
+        probabilities = dict()
+        for index, (cells, _) in enumerate(components):
+            following = after[index + 1]
+            cell_weights = [0.0] * len(cells)
+            for k, (_, cell_ways) in solutions[index].items():
+                factor = sum(
+                    x * following[t + k]
+                    for t, x in prefixes[index].items()
+                )
+                for i, ways in enumerate(cell_ways):
+                    cell_weights[i] += ways * factor
+            for cell, cell_weight in zip(cells, cell_weights):
+                probabilities[cell] = cell_weight / normalizer
+
+        # Unconstrained cells share whatever mines the components leave
+        if not free:
+            density = min(probabilities.values(), default=0.5)
+        else:
+            density = sum(
+                x * weight(k) * (remaining - k) / free
+                for k, x in everything.items()
+            ) / normalizer
+        return probabilities, density
+
+    def density_probabilities(self, components, solutions, remaining, free):
+        """
+        Returns (probabilities, density) as `frontier_probabilities` does,
+        approximating the weight of each total number of mines by a shared
+        density: each cell is a mine with odds exp(`tilt`), where `tilt` is
+        chosen so that the expected number of mines is `remaining`.
+        """
+        # Many components share a distribution, so each is summed once
+        distributions = collections.Counter(
+            tuple(sorted((k, ways) for k, (ways, _) in solution.items()))
+            for solution in solutions
+        )
+
+        def expected_mines(tilt):
+            expected = free / (1 + math.exp(-tilt)) if free else 0.0
+            for distribution, copies in distributions.items():
+                top = max(k * tilt for k, _ in distribution)
+                total = mines = 0.0
+                for k, ways in distribution:
+                    w = ways * math.exp(k * tilt - top)
+                    total += w
+                    mines += k * w
+                expected += copies * mines / total
+            return expected
+
+        # The expected number of mines grows with the tilt
+        low, high = -50.0, 50.0
+        for _ in range(60):
+            tilt = (low + high) / 2
+            if expected_mines(tilt) < remaining:
+                low = tilt
+            else:
+                high = tilt
+        tilt = (low + high) / 2
+
+        probabilities = self.tilted_probabilities(components, solutions, tilt)
+        if not free:
+            density = min(probabilities.values(), default=0.5)
+        else:
+            density = 1 / (1 + math.exp(-tilt))
+        return probabilities, density
+
+    @staticmethod
+    def tilted_probabilities(components, solutions, tilt):
+        """
+        Returns a dict mapping each cell of `components` to the probability
+        that it is a mine, weighting each component's assignments with k
+        mines by exp(k * `tilt`) and treating components as independent.
+        """
+        probabilities = dict()
+        for (cells, _), solution in zip(components, solutions):
+            top = max(k * tilt for k in solution)
+            total = 0.0
+            cell_weights = [0.0] * len(cells)
+            for k, (ways, cell_ways) in solution.items():
+                factor = math.exp(k * tilt - top)
+                total += ways * factor
+                for i, w in enumerate(cell_ways):
+                    cell_weights[i] += w * factor
+            for cell, cell_weight in zip(cells, cell_weights):
+                probabilities[cell] = (
+                    cell_weight / total if total > 0 else 0.5
+                )
+        return probabilities
+
+    def constraint_components(self):
+        """
+        Returns a list of (cells, sentences) pairs, splitting the knowledge
+        base into groups of sentences that share no cells with each other.
+        Each group's cells are listed in board order.
+        """
+        components = []
+        seen = set()
+        for start in self.knowledge:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = set()
+            sentences = []
+            queue = [start]
+            while queue:
+                sentence = queue.pop()
+                sentences.append(sentence)
+                for cell in sentence.cells:
+                    if cell in cells:
+                        continue
+                    cells.add(cell)
+                    for other in self.cell_index.get(cell, set()):
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            components.append((sorted(cells), sentences))
+        return components
+
+    @staticmethod
+    def component_constraints(cells, sentences):
+        """
+        Returns, for a component, the constraints containing each cell and,
+        for each constraint and cell, how many of the constraint's cells
+        come after that cell in `cells`.
+        """
+        position = {cell: i for i, cell in enumerate(cells)}
+        cell_constraints = [[] for _ in cells]
+        after = []
+        for c, sentence in enumerate(sentences):
+            members = sorted(position[cell] for cell in sentence.cells)
+            for rank, i in enumerate(members):
+                cell_constraints[i].append(c)
+            after.append({i: len(members) - rank - 1
+                          for rank, i in enumerate(members)})
+        return cell_constraints, after
+
+    def count_component(self, cells, sentences):
+        """
+        Returns {mines: [ways, [ways with each cell a mine]]} over every
+        assignment of mines to `cells` consistent with `sentences`,
+        memoizing on the cell position and the counts still to place.
+        """
+        cell_constraints, after = self.component_constraints(cells, sentences)
+        memo = dict()
+
+        def solve(i, remaining):
+            if i == len(cells):
+                return {0: [1, []]}
+            key = (i, remaining)
+            if key in memo:
+                return memo[key]
+            result = dict()
+            for value in (0, 1):
+                updated = list(remaining)
+                for c in cell_constraints[i]:
+                    updated[c] -= value
+                if any(updated[c] < 0 or updated[c] > after[c][i]
+                       for c in cell_constraints[i]):
+                    continue
+                for k, (ways, cell_ways) in solve(i + 1, tuple(updated)).items():
+                    entry = result.setdefault(
+                        k + value, [0, [0] * (len(cells) - i)]
+                    )
+                    entry[0] += ways
+                    entry[1][0] += ways * value
+                    for j, w in enumerate(cell_ways):
+                        entry[1][j + 1] += w
+            memo[key] = result
+            return result
+
+        return solve(0, tuple(sentence.count for sentence in sentences))
+
+    def sample_component(self, cells, sentences):
+        """
+        Returns the same structure as `count_component`, estimated from
+        randomized searches for consistent assignments, for components too
+        large to enumerate.
+        """
+        cell_constraints, after = self.component_constraints(cells, sentences)
+        result = dict()
+
+        for _ in range(self.COMPONENT_SAMPLES):
+            remaining = [sentence.count for sentence in sentences]
+            assignment = []
+            choices = []
+            budget = 50 * len(cells)
+            while len(assignment) < len(cells) and budget:
+                budget -= 1
+                i = len(assignment)
+                if len(choices) == i:
+                    choices.append(random.sample((0, 1), 2))
+                if not choices[i]:
+                    # Both values failed here, so undo the previous cell
+                    choices.pop()
+                    if not assignment:
+                        break
+                    value = assignment.pop()
+                    for c in cell_constraints[i - 1]:
+                        remaining[c] += value
+                    continue
+                value = choices[i].pop()
+                if all(0 <= remaining[c] - value <= after[c][i]
+                       for c in cell_constraints[i]):
+                    for c in cell_constraints[i]:
+                        remaining[c] -= value
+                    assignment.append(value)
+            if len(assignment) < len(cells):
+                continue
+            entry = result.setdefault(
+                sum(assignment), [0, [0] * len(cells)]
+            )
+            entry[0] += 1
+            for j, value in enumerate(assignment):
+                entry[1][j] += value
 
-        if len(available_moves) == 0: return None
-        return random.choice(available_moves)
+        return result
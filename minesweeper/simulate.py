@@ -0,0 +1,138 @@
+import argparse
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(height, width, mines, seed, solver):
+    """
+    Plays one seeded game with the AI and returns a dict describing it,
+    including the latency in seconds of every AI call that was timed.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, solver=solver)
+
+    add_knowledge_times = []
+    safe_move_times = []
+    moves = 0
+    revealed = set()
+    won = False
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        safe_move_times.append(time.perf_counter() - start)
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        moves += 1
+
+        reveals = game.reveal(move, revealed)
+        revealed.update(cell for cell, _ in reveals)
+        start = time.perf_counter()
+        ai.add_knowledge_many(reveals)
+        add_knowledge_times.append(time.perf_counter() - start)
+
+        if len(revealed) + mines == height * width:
+            won = True
+            break
+
+    return {
+        "seed": seed,
+        "won": won,
+        "moves": moves,
+        "add_knowledge": add_knowledge_times,
+        "make_safe_move": safe_move_times,
+    }
+
+
+def percentile(values, p):
+    """Returns the `p`th percentile of `values` by nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(int(round(p / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(games, config):
+    """Returns a JSON-serializable summary of the results of `games`."""
+    summary = dict(config)
+    summary["win_rate"] = sum(game["won"] for game in games) / len(games)
+    summary["moves_per_game"] = (
+        sum(game["moves"] for game in games) / len(games)
+    )
+    for name in ("add_knowledge", "make_safe_move"):
+        times = [t for game in games for t in game[name]]
+        summary[name] = {
+            "calls": len(times),
+            "p50_ms": percentile(times, 50) * 1000 if times else None,
+            "p99_ms": percentile(times, 99) * 1000 if times else None,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many Minesweeper games with the AI, without a "
+                    "display, and report results as JSON."
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    mines = parser.add_mutually_exclusive_group()
+    mines.add_argument("--mines", type=int)
+    mines.add_argument("--density", type=float)
+    parser.add_argument("--solver", choices=["subset", "linear"],
+                        default="subset")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", help="file to write JSON to")
+    args = parser.parse_args()
+
+    if args.mines is not None:
+        count = args.mines
+    elif args.density is not None:
+        count = round(args.density * args.height * args.width)
+    else:
+        count = 8
+    if not 0 <= count < args.height * args.width:
+        sys.exit("Number of mines must leave at least one safe cell.")
+
+    config = {
+        "games": args.games,
+        "height": args.height,
+        "width": args.width,
+        "mines": count,
+        "solver": args.solver,
+        "seed": args.seed,
+    }
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.processes
+    ) as executor:
+        games = list(executor.map(
+            play,
+            [args.height] * args.games,
+            [args.width] * args.games,
+            [count] * args.games,
+            range(args.seed, args.seed + args.games),
+            [args.solver] * args.games,
+            chunksize=max(args.games // 64, 1)
+        ))
+
+    result = json.dumps(summarize(games, config), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,156 @@
+import itertools
+import math
+import random
+import time
+
 from minesweeper import *
+from simulate import play
+
+
+def play_checked(height, width, mines, seed, solver):
+    """
+    Plays one seeded game, checking after every move that the AI has not
+    marked a mine safe or a safe cell as a mine.
+    """
+    random.seed(seed)
+    game = Minesweeper(height, width, mines)
+    ai = MinesweeperAI(height, width, mines=mines, solver=solver)
+    revealed = set()
+    while len(revealed) + mines < height * width:
+        move = ai.make_safe_move()
+        if move is not None:
+            assert not game.is_mine(move), (seed, solver, move)
+        else:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            return
+        reveals = game.reveal(move, revealed)
+        revealed.update(cell for cell, _ in reveals)
+        ai.add_knowledge_many(reveals)
+        assert not any(game.is_mine(cell) for cell in ai.safes), (seed, solver)
+        assert all(game.is_mine(cell) for cell in ai.mines), (seed, solver)
+
+
+def test_sound():
+    for solver in ("subset", "linear"):
+        for seed in range(100):
+            play_checked(8, 8, 10, seed, solver)
+        for seed in range(20):
+            play_checked(16, 16, 40, seed, solver)
+
+
+def test_probabilities():
+    for seed in range(30):
+        random.seed(seed)
+        height, width, mines = 4, 4, 3
+        game = Minesweeper(height, width, mines)
+        ai = MinesweeperAI(height, width, mines=mines)
+        revealed = dict()
+        for _ in range(random.randint(1, 3)):
+            move = ai.make_safe_move() or ai.make_random_move()
+            if move is None or game.is_mine(move):
+                break
+            revealed[move] = game.nearby_mines(move)
+            ai.add_knowledge(move, revealed[move])
+
+        # Count every placement of mines agreeing with what was revealed
+        cells = [(i, j) for i in range(height) for j in range(width)]
+        hidden = [cell for cell in cells if cell not in revealed]
+        layouts = 0
+        hits = dict.fromkeys(hidden, 0)
+        for placement in itertools.combinations(hidden, mines):
+            placement = set(placement)
+            if all(
+                count == sum(
+                    (i + di, j + dj) in placement
+                    for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                )
+                for (i, j), count in revealed.items()
+            ):
+                layouts += 1
+                for cell in placement:
+                    hits[cell] += 1
+
+        for cell, probability in ai.mine_probabilities().items():
+            assert abs(probability - hits[cell] / layouts) < 1e-9, (seed, cell)
+
+
+def test_guess_latency():
+    # Scattered reveals on a large board leave hundreds of components
+    random.seed(0)
+    size, mines = 300, 18000
+    game = Minesweeper(size, size, mines)
+    ai = MinesweeperAI(size, size, mines=mines)
+    revealed = set()
+    for _ in range(1800):
+        cell = (random.randrange(size), random.randrange(size))
+        if game.is_mine(cell) or cell in revealed:
+            continue
+        reveals = game.reveal(cell, revealed)
+        revealed.update(cell for cell, _ in reveals)
+        ai.add_knowledge_many(reveals)
+    assert len(ai.constraint_components()) > ai.COMPONENT_EXACT_LIMIT
+
+    for _ in range(3):
+        start = time.perf_counter()
+        move = ai.make_random_move()
+        assert time.perf_counter() - start < 2, "guessing took too long"
+        assert move not in ai.mines and move not in ai.moves_made
+
+
+def test_density_approximation():
+    random.seed(1)
+    size, mines = 60, 720
+    game = Minesweeper(size, size, mines)
+    ai = MinesweeperAI(size, size, mines=mines)
+    revealed = set()
+    for _ in range(180):
+        cell = (random.randrange(size), random.randrange(size))
+        if game.is_mine(cell) or cell in revealed:
+            continue
+        reveals = game.reveal(cell, revealed)
+        revealed.update(cell for cell, _ in reveals)
+        ai.add_knowledge_many(reveals)
+
+    ai.COMPONENT_EXACT_LIMIT = math.inf
+    exact, exact_density = ai.frontier_probabilities()
+    ai.COMPONENT_EXACT_LIMIT = 0
+    approximate, density = ai.frontier_probabilities()
+    assert abs(density - exact_density) < 1e-3
+    for cell, probability in exact.items():
+        assert abs(approximate[cell] - probability) < 1e-2, cell
+
+
+def test_sentence():
+    a = Sentence({(0, 1), (1, 2), (2, 0)}, 2, width=5)
+    b = Sentence({(2, 0), (1, 2)}, 1, width=5)
+    assert b.issubset(a) and not a.issubset(b)
+    assert a.difference(b) == Sentence({(0, 1)}, 1, width=5)
+    assert a.mark_mine((1, 2)) == Sentence({(0, 1), (2, 0)}, 1, width=5)
+    assert a.mark_safe((4, 4)) is a
+    assert hash(b) == hash(Sentence([(1, 2), (2, 0)], 1, width=5))
+    assert a.cells == {(0, 1), (1, 2), (2, 0)} and len(a) == 3
+    try:
+        a.count = 1
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("sentences should be immutable")
+
 
-ms = Minesweeper()
+def test_play_repeatable():
+    first = play(16, 16, 40, 103, "subset")
+    for seed in range(10):
+        play(16, 16, 40, seed, "linear")
+    again = play(16, 16, 40, 103, "subset")
+    assert (first["won"], first["moves"]) == (again["won"], again["moves"])
 
-for row in ms.board:
-    for cell in row:
-        print(cell)
 
+if __name__ == "__main__":
+    test_sentence()
+    test_probabilities()
+    test_guess_latency()
+    test_density_approximation()
+    test_sound()
+    test_play_repeatable()
+    print("All tests passed.")